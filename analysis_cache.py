@@ -0,0 +1,71 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+from cache import DiskCache
+from storage import Singleton, data_path
+
+ANALYSIS_CACHE_DB = data_path("ANALYSIS_CACHE_DB", "analysis_cache.db")
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 86400)))
+ANALYSIS_CACHE_MAX_ROWS = int(os.getenv("ANALYSIS_CACHE_MAX_ROWS", "20000"))
+
+
+def analysis_key(video_id: str, model: str, prompt_version: str) -> str:
+    # Prompt version is part of the key so a prompt change invalidates old entries
+    return f"{video_id}:{model}:{prompt_version}"
+
+
+class AnalysisCache:
+    def __init__(self, path: str = ANALYSIS_CACHE_DB, ttl: float = ANALYSIS_CACHE_TTL,
+                 max_entries: int = ANALYSIS_CACHE_MAX_ROWS):
+        self.ttl = ttl
+        self.disk = DiskCache(path, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, video_id: str, model: str, prompt_version: str) -> Optional[str]:
+        key = analysis_key(video_id, model, prompt_version)
+        try:
+            row = self.disk.get(key)
+        except sqlite3.Error:
+            row = None
+        if row is None or time.time() >= row[2]:
+            self._count("misses")
+            return None
+        try:
+            self.disk.touch(key)
+        except sqlite3.Error:
+            pass
+        self._count("hits")
+        return row[0]["content_analysis"]
+
+    def put(self, video_id: str, model: str, prompt_version: str, content_analysis: str):
+        stored_at = time.time()
+        try:
+            self.disk.put(
+                analysis_key(video_id, model, prompt_version),
+                "content_analysis",
+                {"content_analysis": content_analysis},
+                stored_at,
+                stored_at + self.ttl
+            )
+            self._count("stores")
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_analysis_cache = Singleton(AnalysisCache)
+
+
+def get_analysis_cache() -> AnalysisCache:
+    return _analysis_cache.get()
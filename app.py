@@ -1,19 +1,39 @@
 import os
 import json
-import requests
 import base64
-from typing import Dict, List, Optional, Any, Type
-from flask import Flask, request, jsonify
+from typing import Dict, List, Optional, Any, Type, Callable
+from flask import Flask, request, jsonify, Response, stream_with_context
 from crewai import Agent, Task, Crew, Process
 from crewai.tools import BaseTool
 from langchain_google_genai import GoogleGenerativeAI
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from flask_cors import CORS
-from datetime import datetime
 import re
+import time
+import queue
+import asyncio
+import threading
+from abc import abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from youtube_client import (
+    youtube_get, fetch_channels, fetch_videos, iter_video_pages, latency_stats, cache_stats, quota_status, key_stats
+)
+from async_youtube import collect_video_records_async
+from keys import youtube_keys, gemini_keys
+from analysis_cache import get_analysis_cache
+from jobs import JobQueueFull, get_job_manager
+from singleflight import request_key, get_single_flight
+from normalize import parse_duration, video_age_days, matches_content_type, collect_video_records, build_video_record
+from keywords import extract_keyword, keyword_counts
+from compaction import ContextCompactor, STAGE_TOKEN_BUDGET, compaction_stats
+from trending_index import get_trending_index, get_refresher, TRENDING_REFRESH_ENABLED
+from search_index import get_search_index
+from metrics import rank_videos, compute_metrics, METRIC_NAMES
+from strategy import outline, parse_strategy, StrategyParseError
+from gemini import batch_invoke, gemini_stats
 
 # Load environment variables
 load_dotenv()
@@ -21,112 +41,117 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app, origins=["*"])
 
+# Parts requested for search results' follow-up videos.list calls
+VIDEO_DETAIL_PARTS = "snippet,contentDetails,statistics"
+
+def index_videos(records: List[Dict[str, Any]], region_code: Optional[str] = None):
+    # Every harvested record feeds the local search index; indexing never fails a tool call
+    try:
+        get_search_index().add(records, region_code)
+    except Exception as e:
+        print(f"Error indexing videos: {str(e)}")
+
+def video_metrics(records: List[Dict[str, Any]], region_code: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Percentile ranks need the baseline store; without it the plain metrics are still returned
+    try:
+        return rank_videos(records, region_code)
+    except Exception as e:
+        print(f"Error ranking videos: {str(e)}")
+        computed = compute_metrics(records)
+        return [{name: float(computed[name][index]) for name in METRIC_NAMES} for index in range(len(records))]
+
+def attach_metrics(records: List[Dict[str, Any]], region_code: Optional[str] = None):
+    for record, metrics in zip(records, video_metrics(records, region_code)):
+        record["metrics"] = metrics
+
+# Shared by the trending and search fetchers: a local answer when one is good
+# enough, otherwise paged API results
+class YouTubeFetcherTool(BaseTool):
+    # Videos returned during the current run, for the keyword counts
+    harvested: List[Dict[str, Any]] = Field(default_factory=list)
+
+    def _local_result(self, query: str, region_code: str, content_type: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    @abstractmethod
+    def _search_params(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
+        pass
+
+    def _finish(self, filtered_videos: List[Dict[str, Any]], region_code: str) -> Dict[str, Any]:
+        attach_metrics(filtered_videos, region_code)
+        index_videos(filtered_videos, region_code)
+        self.harvested.extend(filtered_videos)
+        return {"videos": filtered_videos}
+
+    def _run(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
+        if not youtube_keys().keys:
+            return {"error": "YouTube API key not found"}
+        
+        local = self._local_result(query, region_code, content_type)
+        if local:
+            return local
+        
+        try:
+            # Page through results until 10 videos match content_type
+            pages = iter_video_pages(self._search_params(query, region_code, content_type), VIDEO_DETAIL_PARTS)
+            return self._finish(collect_video_records(pages, content_type, limit=10), region_code)
+            
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _arun(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
+        # Same result as _run, with non-blocking YouTube calls; the SQLite
+        # lookups and writes run off the event loop
+        if not youtube_keys().keys:
+            return {"error": "YouTube API key not found"}
+        
+        local = await asyncio.to_thread(self._local_result, query, region_code, content_type)
+        if local:
+            return local
+        
+        try:
+            params = self._search_params(query, region_code, content_type)
+            filtered_videos = await collect_video_records_async(params, VIDEO_DETAIL_PARTS, content_type, limit=10)
+            return await asyncio.to_thread(self._finish, filtered_videos, region_code)
+            
+        except Exception as e:
+            return {"error": str(e)}
+
 # Tool for fetching trending YouTube videos
 class YouTubeTrendingToolInput(BaseModel):
     query: str = Field(description="Search keyword")
     region_code: str = Field(description="Region code (e.g., IN, US)")
     content_type: str = Field(description="Type of content: shorts, videos, or both")
 
-class YouTubeTrendingTool(BaseTool):
+class YouTubeTrendingTool(YouTubeFetcherTool):
     name: str = "youtube_trending_fetcher"
     description: str = "Fetches top trending YouTube content in a specific query and region"
     args_schema: Type[BaseModel] = YouTubeTrendingToolInput
 
-    def _run(self,query: str, region_code: str, content_type: str) -> Dict[str, Any]:
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        if not api_key:
-            return {"error": "YouTube API key not found"}
-        
-        url = f"https://www.googleapis.com/youtube/v3/search"
-        params = {
+    def _local_result(self, query: str, region_code: str, content_type: str) -> Optional[Dict[str, Any]]:
+        # Answer from the freshest background snapshot when it has enough matches
+        try:
+            snapshot = get_trending_index().lookup(region_code, query)
+        except Exception:
+            snapshot = None
+        if snapshot:
+            filtered_videos = collect_video_records([snapshot["items"]], content_type, limit=10)
+            if len(filtered_videos) >= 10:
+                velocity = {item.get("id"): item.get("view_velocity_per_hour") for item in snapshot["items"]}
+                for video in filtered_videos:
+                    video["view_velocity_per_hour"] = velocity.get(video["video_id"])
+                return dict(self._finish(filtered_videos, region_code), snapshot_taken_at=snapshot["taken_at"])
+        return None
+
+    def _search_params(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
+        return {
             "part": "snippet",
             "type": "video",
-            "maxResults": 4,  # Fetch more to filter by content type
             "regionCode": region_code,
             "q": query,
             "order": "viewCount",
-            "publishedAfter": "2025-04-01T00:00:00Z",
-            "key": api_key
+            "publishedAfter": "2025-04-01T00:00:00Z"
         }
-        
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            # Filter based on content_type
-            filtered_videos = []
-            for item in data.get("items", []):
-                duration = item.get("contentDetails", {}).get("duration", "")
-                # Parse duration
-                seconds = 0
-                if "PT" in duration:
-                    if "M" in duration:
-                        minutes_part = duration.split("PT")[1].split("M")[0]
-                        seconds += int(minutes_part) * 60
-                    if "S" in duration:
-                        if "M" in duration:
-                            seconds_part = duration.split("M")[1].split("S")[0]
-                        else:
-                            seconds_part = duration.split("PT")[1].split("S")[0]
-                        seconds += int(seconds_part)
-                
-                # Filter based on content_type
-                if (content_type == "shorts" and seconds <= 60) or \
-                   (content_type == "videos" and seconds > 60) or \
-                   (content_type == "both"):
-                    
-                    # Get published date and calculate video age
-                    published_at = item.get("snippet", {}).get("publishedAt", "")
-                    published_date = None
-                    video_age_days = None
-                    
-                    try:
-                        if published_at:
-                            published_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
-                            video_age_days = (datetime.now() - published_date).days
-                    except Exception:
-                        pass
-                    
-                    # Collect all available tags
-                    tags = item.get("snippet", {}).get("tags", [])
-                    
-                    # Calculate engagement metrics
-                    # view_count = int(item.get("statistics", {}).get("viewCount", 0))
-                    # like_count = int(item.get("statistics", {}).get("likeCount", 0))
-                    # comment_count = int(item.get("statistics", {}).get("commentCount", 0))
-                    
-                    # like_view_ratio = 0
-                    # comment_view_ratio = 0
-                    
-                    # if view_count > 0:
-                    #     like_view_ratio = like_count / view_count
-                    #     comment_view_ratio = comment_count / view_count
-                    
-                    filtered_videos.append({
-                        "video_id": item.get("id"),
-                        "title": item.get("snippet", {}).get("title"),
-                        "description": item.get("snippet", {}).get("description"),
-                        "channel_id": item.get("snippet", {}).get("channelId"),
-                        "channel_title": item.get("snippet", {}).get("channelTitle"),
-                        "published_at": published_at,
-                        "video_age_days": video_age_days,
-                        "duration_seconds": seconds,
-                        "tags": tags,
-                        "tag_count": len(tags),
-                        # "view_count": view_count,
-                        # "like_count": like_count,
-                        # "comment_count": comment_count,
-                        # "like_view_ratio": like_view_ratio,
-                        # "comment_view_ratio": comment_view_ratio,
-                    })
-                
-                if len(filtered_videos) >= 10:
-                    break
-            
-            return {"videos": filtered_videos[:10]}  # Return only top 10 videos
-            
-        except Exception as e:
-            return {"error": str(e)}
 
 # Tool for searching YouTube videos
 class YouTubeSearchToolInput(BaseModel):
@@ -134,26 +159,39 @@ class YouTubeSearchToolInput(BaseModel):
     region_code: str = Field(description="Region code (e.g., IN, US)")
     content_type: str = Field(description="Type of content: shorts, videos, or both")
 
-class YouTubeSearchTool(BaseTool):
+class YouTubeSearchTool(YouTubeFetcherTool):
     name: str = "youtube_search_fetcher"
     description: str = "Searches for relevant YouTube content based on keyword and category"
     args_schema: Type[BaseModel] = YouTubeSearchToolInput
+    # Local-first: answer from the search index and only call the API when it
+    # has too few fresh matches
+    local_first: bool = os.getenv("SEARCH_LOCAL_FIRST", "1") == "1"
+    local_min_results: int = int(os.getenv("SEARCH_LOCAL_MIN_RESULTS", "10"))
 
-    def _run(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        if not api_key:
-            return {"error": "YouTube API key not found"}
-        
-        url = f"https://www.googleapis.com/youtube/v3/search"
+    def _local_result(self, query: str, region_code: str, content_type: str) -> Optional[Dict[str, Any]]:
+        if not self.local_first:
+            return None
+        try:
+            local_videos = get_search_index().search(
+                query, region_code, content_type, published_after="2025-01-01T00:00:00Z", limit=10
+            )
+        except Exception:
+            local_videos = []
+        if len(local_videos) >= self.local_min_results:
+            # Already indexed; only the metrics are refreshed
+            attach_metrics(local_videos, region_code)
+            self.harvested.extend(local_videos)
+            return {"videos": local_videos, "source": "local_index"}
+        return None
+
+    def _search_params(self, query: str, region_code: str, content_type: str) -> Dict[str, Any]:
         params = {
             "part": "snippet",
             "type": "video",
-            "maxResults": 4,  # Fetch more to filter by content type
             "regionCode": region_code,
             "q": query,
             "order": "viewCount",
-            "publishedAfter": "2025-01-01T00:00:00Z",
-            "key": api_key
+            "publishedAfter": "2025-01-01T00:00:00Z"
         }
         
         # Apply duration filter if we're only looking for one type
@@ -161,290 +199,224 @@ class YouTubeSearchTool(BaseTool):
             params["videoDuration"] = "short"
         elif content_type == "videos":
             params["videoDuration"] = "medium"
-        
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            # print("Search Data:",data)
-            
-            # Extract video IDs for additional data fetch
-            video_ids = []
-            for item in data.get("items", []):
-                video_id = item.get("id", {}).get("videoId")
-                if video_id:
-                    video_ids.append(video_id)
-            
-            # Get detailed video information
-            if video_ids:
-                videos_url = f"https://www.googleapis.com/youtube/v3/videos"
-                videos_params = {
-                    "part": "snippet,contentDetails,statistics",
-                    "id": ",".join(video_ids),
-                    "key": api_key
-                }
-                
-                videos_response = requests.get(videos_url, videos_params)
-                videos_data = videos_response.json()
-                
-                # Filter and process videos
-                filtered_videos = []
-                for item in videos_data.get("items", []):
-                    duration = item.get("contentDetails", {}).get("duration", "")
-                    # Parse duration
-                    seconds = 0
-                    if "PT" in duration:
-                        if "M" in duration:
-                            minutes_part = duration.split("PT")[1].split("M")[0]
-                            seconds += int(minutes_part) * 60
-                        if "S" in duration:
-                            if "M" in duration:
-                                seconds_part = duration.split("M")[1].split("S")[0]
-                            else:
-                                seconds_part = duration.split("PT")[1].split("S")[0]
-                            seconds += int(seconds_part)
-                    
-                    # Filter based on content_type
-                    if (content_type == "shorts" and seconds <= 60) or \
-                       (content_type == "videos" and seconds > 60) or \
-                       (content_type == "both"):
-                        
-                        # Get published date and calculate video age
-                        published_at = item.get("snippet", {}).get("publishedAt", "")
-                        published_date = None
-                        video_age_days = None
-                        
-                        try:
-                            if published_at:
-                                published_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
-                                video_age_days = (datetime.now() - published_date).days
-                        except Exception:
-                            pass
-                        
-                        # Collect all available tags
-                        tags = item.get("snippet", {}).get("tags", [])
-                        
-                        # Calculate engagement metrics
-                        # view_count = int(item.get("statistics", {}).get("viewCount", 0))
-                        # like_count = int(item.get("statistics", {}).get("likeCount", 0))
-                        # comment_count = int(item.get("statistics", {}).get("commentCount", 0))
-                        
-                        # like_view_ratio = 0
-                        # comment_view_ratio = 0
-                        
-                        # if view_count > 0:
-                        #     like_view_ratio = like_count / view_count
-                        #     comment_view_ratio = comment_count / view_count
-                        
-                        filtered_videos.append({
-                            "video_id": item.get("id"),
-                            "title": item.get("snippet", {}).get("title"),
-                            "description": item.get("snippet", {}).get("description"),
-                            "channel_id": item.get("snippet", {}).get("channelId"),
-                            "channel_title": item.get("snippet", {}).get("channelTitle"),
-                            "published_at": published_at,
-                            "video_age_days": video_age_days,
-                            "duration_seconds": seconds,
-                            "tags": tags,
-                            "tag_count": len(tags),
-                            # "view_count": view_count,
-                            # "like_count": like_count,
-                            # "comment_count": comment_count,
-                            # "like_view_ratio": like_view_ratio,
-                            # "comment_view_ratio": comment_view_ratio,
-                        })
-                    
-                    if len(filtered_videos) >= 10:
-                        break
-                
-                return {"videos": filtered_videos[:10]}  # Return only top 10 results
-            else:
-                return {"videos": []}
-            
-        except Exception as e:
-            return {"error": str(e)}
+        return params
 
 # Tool for deep video analysis
 class VideoAnalysisToolInput(BaseModel):
     video_ids: List[str] = Field(description="List of YouTube video ID")
     content_type: str = Field(description="Type of content: shorts, videos, or both")
+    deep_video_ids: Optional[List[str]] = Field(
+        default=None,
+        description="IDs that get the full deep analysis (comments, channel, content analysis); "
+                    "the other IDs get metadata and statistics only. Omit to analyze every ID deeply"
+    )
+    refresh_analysis: bool = Field(default=False, description="Ignore stored content analyses and re-run them")
+
+# Bump the prompt version whenever the analysis prompt changes
+ANALYSIS_MODEL = "gemini-2.0-flash"
+ANALYSIS_PROMPT_VERSION = "v1"
 
 class VideoAnalysisTool(BaseTool):
     name: str = "video_content_analyzer"
     description: str = "Performs deep analysis of YouTube videos' content, metadata, and audience engagement"
     args_schema: Type[BaseModel] = VideoAnalysisToolInput  # This should now accept List[str]
+    max_concurrency: int = int(os.getenv("VIDEO_ANALYSIS_CONCURRENCY", "8"))
 
-    def _run(self, video_ids: List[str], content_type: str) -> List[Dict[str, Any]]:
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        if not api_key:
+    def _run(self, video_ids: List[str], content_type: str, deep_video_ids: Optional[List[str]] = None,
+             refresh_analysis: bool = False) -> List[Dict[str, Any]]:
+        if not youtube_keys().keys:
             return [{"error": "YouTube API key not found"}]
 
-        video_id_str = ",".join(video_ids[:50])  # Max 50 IDs per request
-        url = "https://www.googleapis.com/youtube/v3/videos"
-        params = {
-            "part": "snippet,contentDetails,statistics,topicDetails",
-            "id": video_id_str,
-            "key": api_key
-        }
-
         try:
-            response = requests.get(url, params=params)
-            video_data = response.json()
+            # Cached static parts plus a statistics-only refresh, in the same order as the requested IDs
+            video_items = fetch_videos(video_ids[:50], "snippet,contentDetails,statistics,topicDetails")  # Max 50 IDs per request
 
-            if not video_data.get("items"):
+            if not video_items:
                 return [{"error": "No videos found"}]
+            records = [
+                build_video_record(item, parse_duration(item.get("contentDetails", {}).get("duration", "")))
+                for item in video_items
+            ]
+            index_videos(records)
+            # Metrics and percentile ranks for the whole batch in one pass
+            metrics = {record["video_id"]: values for record, values in zip(records, video_metrics(records))}
 
-            results = []
+            # Only deep videos need comments, channel info and an LLM pass
+            deep_ids = set(deep_video_ids) if deep_video_ids is not None else {item.get("id") for item in video_items}
+            deep_items = [item for item in video_items if item.get("id") in deep_ids]
 
-            for video_item in video_data["items"]:
-                try:
-                    video_id = video_item["id"]
-                    duration = video_item.get("contentDetails", {}).get("duration", "")
-                    
-                    # Duration parsing
-                    seconds = 0
-                    if "PT" in duration:
-                        if "M" in duration:
-                            minutes_part = duration.split("PT")[1].split("M")[0]
-                            seconds += int(minutes_part) * 60
-                        if "S" in duration:
-                            if "M" in duration:
-                                seconds_part = duration.split("M")[1].split("S")[0]
-                            else:
-                                seconds_part = duration.split("PT")[1].split("S")[0]
-                            seconds += int(seconds_part)
-
-                    # Type check
-                    if (content_type == "shorts" and seconds > 60) or \
-                       (content_type == "videos" and seconds <= 60):
-                        results.append({"video_id": video_id, "error": f"Does not match content type '{content_type}'"})
-                        continue
-
-                    # Fetch comments
-                    comments_url = f"https://www.googleapis.com/youtube/v3/commentThreads"
-                    comments_params = {
-                        "part": "snippet",
-                        "videoId": video_id,
-                        "maxResults": 100,
-                        "order": "relevance",
-                        "key": api_key
-                    }
-
-                    try:
-                        comments_response = requests.get(comments_url, params=comments_params)
-                        comments_data = comments_response.json()
-                        comments = []
-                        for item in comments_data.get("items", [])[:3]:
-                            snippet = item["snippet"]["topLevelComment"]["snippet"]
-                            comments.append({
-                                "text": snippet.get("textDisplay", ""),
-                                "like_count": snippet.get("likeCount", 0),
-                                "published_at": snippet.get("publishedAt", "")
-                            })
-                    except:
-                        comments = []
-
-                    # Fetch channel info
-                    channel_id = video_item.get("snippet", {}).get("channelId")
-                    channel_url = f"https://www.googleapis.com/youtube/v3/channels"
-                    channel_params = {
-                        "part": "snippet,statistics,brandingSettings",
-                        "id": channel_id,
-                        "key": api_key
-                    }
-                    try:
-                        channel_response = requests.get(channel_url, params=channel_params)
-                        channel_data = channel_response.json()
-                        channel_info = channel_data.get("items", [{}])[0]
-                    except:
-                        channel_info = {}
-
-                    # LLM analysis
-                    try:
-                        gemini_api_key = os.getenv("GEMINI_API_KEY")
-                        model = ChatGoogleGenerativeAI(
-                            model="gemini-2.0-flash",
-                            google_api_key=gemini_api_key,
-                            temperature=0
-                        )
-                        video_url = f"https://www.youtube.com/watch?v={video_id}"
-                        messages = [
-                            SystemMessage(content="You are an expert video content analyzer."),
-                            HumanMessage(content=f"Analyze this YouTube {'short' if seconds <= 60 else 'video'}: {video_url}...")
-                        ]
-                        response = model.invoke(messages)
-                        video_analysis = response.content
-                    except Exception as e:
-                        video_analysis = f"Error analyzing video content: {str(e)}"
-
-                    # Metrics calculation
-                    published_at = video_item.get("snippet", {}).get("publishedAt", "")
-                    try:
-                        published_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
-                        video_age_days = (datetime.now() - published_date).days
-                    except:
-                        video_age_days = None
-
-                    view_count = int(video_item.get("statistics", {}).get("viewCount", 0))
-                    like_count = int(video_item.get("statistics", {}).get("likeCount", 0))
-                    comment_count = int(video_item.get("statistics", {}).get("commentCount", 0))
-
-                    views_per_day = view_count / video_age_days if video_age_days and video_age_days > 0 else 0
-                    likes_per_day = like_count / video_age_days if video_age_days and video_age_days > 0 else 0
-                    comments_per_day = comment_count / video_age_days if video_age_days and video_age_days > 0 else 0
-
-                    like_view_ratio = like_count / view_count if view_count > 0 else 0
-                    comment_view_ratio = comment_count / view_count if view_count > 0 else 0
-                    engagement_rate = (like_count + comment_count) / view_count if view_count > 0 else 0
-
-                    results.append({
-                        "video_id": video_id,
-                        "metadata": {
-                            "title": video_item.get("snippet", {}).get("title"),
-                            "description": video_item.get("snippet", {}).get("description"),
-                            "tags": video_item.get("snippet", {}).get("tags", []),
-                            "tag_count": len(video_item.get("snippet", {}).get("tags", [])),
-                            "publishedAt": published_at,
-                            "video_age_days": video_age_days,
-                            "categoryId": video_item.get("snippet", {}).get("categoryId"),
-                            "duration_seconds": seconds,
-                            "duration_formatted": duration
-                        },
-                        "statistics": {
-                            "viewCount": view_count,
-                            "likeCount": like_count,
-                            "commentCount": comment_count,
-                            "views_per_day": views_per_day,
-                            "likes_per_day": likes_per_day,
-                            "comments_per_day": comments_per_day,
-                            "like_view_ratio": like_view_ratio,
-                            "comment_view_ratio": comment_view_ratio,
-                            "engagement_rate": engagement_rate
-                        },
-                        "channel": {
-                            "id": channel_id,
-                            "title": channel_info.get("snippet", {}).get("title"),
-                            "description": channel_info.get("snippet", {}).get("description"),
-                            "subscriberCount": channel_info.get("statistics", {}).get("subscriberCount"),
-                            "videoCount": channel_info.get("statistics", {}).get("videoCount"),
-                            "country": channel_info.get("snippet", {}).get("country")
-                        },
-                        "comments": comments,
-                        "content_analysis": video_analysis,
-                        "video_url": video_url
-                    })
-                except Exception as e:
-                    results.append({"video_id": video_item.get("id"), "error": str(e)})
+            # Resolve every distinct channel up front in batched calls
+            try:
+                channels = fetch_channels(
+                    [item.get("snippet", {}).get("channelId") for item in deep_items]
+                ) if deep_items else {}
+            except Exception:
+                channels = {}
+
+            # Comments for each deep video are fetched concurrently
+            deep_results = {}
+            if deep_items:
+                workers = max(1, min(self.max_concurrency, len(deep_items)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    analyzed = executor.map(
+                        lambda video_item: self._analyze_video(
+                            video_item, content_type, channels, refresh_analysis, metrics=metrics.get(video_item.get("id"))
+                        ),
+                        deep_items
+                    )
+                    deep_results = {id(item): result for item, result in zip(deep_items, analyzed)}
+
+            # Content analyses missing from the cache go to Gemini as one batch
+            self._analyze_contents([
+                result for result in deep_results.values()
+                if "content_analysis" in result and result["content_analysis"] is None
+            ])
 
-            return results
+            return [
+                deep_results[id(item)] if id(item) in deep_results
+                else self._analyze_video(item, content_type, channels, deep=False, metrics=metrics.get(item.get("id")))
+                for item in video_items
+            ]
 
         except Exception as e:
             return [{"error": str(e)}]
 
+    def _analyze_video(self, video_item: Dict[str, Any], content_type: str,
+                       channels: Dict[str, Dict[str, Any]], refresh_analysis: bool = False,
+                       deep: bool = True, metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        try:
+            video_id = video_item["id"]
+            duration = video_item.get("contentDetails", {}).get("duration", "")
+            seconds = parse_duration(duration)
+
+            # Type check
+            if not matches_content_type(seconds, content_type):
+                return {"video_id": video_id, "error": f"Does not match content type '{content_type}'"}
+
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+
+            # Metrics calculation
+            published_at = video_item.get("snippet", {}).get("publishedAt", "")
+            age_days = video_age_days(published_at)
+
+            view_count = int(video_item.get("statistics", {}).get("viewCount", 0))
+            like_count = int(video_item.get("statistics", {}).get("likeCount", 0))
+            comment_count = int(video_item.get("statistics", {}).get("commentCount", 0))
+
+            # Rates and percentile ranks come from the batch computed in _run
+            metrics = metrics or {}
+
+            result = {
+                "video_id": video_id,
+                "analysis_depth": "deep" if deep else "metadata",
+                "metadata": {
+                    "title": video_item.get("snippet", {}).get("title"),
+                    "description": video_item.get("snippet", {}).get("description"),
+                    "tags": video_item.get("snippet", {}).get("tags", []),
+                    "tag_count": len(video_item.get("snippet", {}).get("tags", [])),
+                    "publishedAt": published_at,
+                    "video_age_days": age_days,
+                    "categoryId": video_item.get("snippet", {}).get("categoryId"),
+                    "duration_seconds": seconds,
+                    "duration_formatted": duration
+                },
+                "statistics": {
+                    "viewCount": view_count,
+                    "likeCount": like_count,
+                    "commentCount": comment_count,
+                    **{name: metrics.get(name, 0) for name in METRIC_NAMES},
+                    "percentile_ranks": metrics.get("percentile_ranks", {})
+                },
+                "video_url": video_url
+            }
+
+            # Metadata-only videos stop here: no comments, channel or LLM calls
+            if not deep:
+                return result
+
+            # Fetch comments
+            comments_params = {
+                "part": "snippet",
+                "videoId": video_id,
+                "maxResults": 100,
+                "order": "relevance"
+            }
+
+            try:
+                comments_data = youtube_get("commentThreads", comments_params)
+                comments = []
+                for item in comments_data.get("items", [])[:3]:
+                    snippet = item["snippet"]["topLevelComment"]["snippet"]
+                    comments.append({
+                        "text": snippet.get("textDisplay", ""),
+                        "like_count": snippet.get("likeCount", 0),
+                        "published_at": snippet.get("publishedAt", "")
+                    })
+            except:
+                comments = []
+
+            # Channel info from the batched lookup
+            channel_id = video_item.get("snippet", {}).get("channelId")
+            channel_info = channels.get(channel_id, {})
+
+            # LLM analysis, reused from the analysis cache unless a refresh is requested;
+            # None marks it for the batch sent from _run
+            video_analysis = None
+            if not refresh_analysis:
+                video_analysis = get_analysis_cache().get(video_id, ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION)
+
+            result["channel"] = {
+                "id": channel_id,
+                "title": channel_info.get("snippet", {}).get("title"),
+                "description": channel_info.get("snippet", {}).get("description"),
+                "subscriberCount": channel_info.get("statistics", {}).get("subscriberCount"),
+                "videoCount": channel_info.get("statistics", {}).get("videoCount"),
+                "country": channel_info.get("snippet", {}).get("country")
+            }
+            result["comments"] = comments
+            result["content_analysis"] = video_analysis
+            return result
+        except Exception as e:
+            return {"video_id": video_item.get("id"), "error": str(e)}
+
+    def _analyze_contents(self, results: List[Dict[str, Any]]):
+        prompts = [
+            [
+                SystemMessage(content="You are an expert video content analyzer."),
+                HumanMessage(content=f"Analyze this YouTube {'short' if result['metadata']['duration_seconds'] <= 60 else 'video'}: {result['video_url']}...")
+            ]
+            for result in results
+        ]
+        try:
+            answers = batch_invoke(ANALYSIS_MODEL, prompts)
+        except Exception as e:
+            answers = [e] * len(results)
+
+        analysis_cache = get_analysis_cache()
+        for result, answer in zip(results, answers):
+            if isinstance(answer, Exception):
+                result["content_analysis"] = f"Error analyzing video content: {str(answer)}"
+            else:
+                result["content_analysis"] = answer
+                analysis_cache.put(result["video_id"], ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, answer)
+
+# Names of the crew stages, in task order
+STAGES = ["trending", "search", "selection", "analysis", "strategy"]
+
+def prefetch_arguments(user_prompt: str, content_type: str, region_code: str):
+    # The fetcher tasks' rules for keyword, region and content type, applied without an agent
+    keyword = extract_keyword(user_prompt)
+    if not re.fullmatch(r"[A-Za-z]{2}", region_code or ""):
+        region_code = "IN"
+    if content_type not in ("shorts", "videos", "both"):
+        content_type = "both"
+    return keyword, region_code.upper(), content_type
+
 # CrewAI setup
 class YouTubeContentCrew:
     def __init__(self):
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
+        # Spread pooled crews over the configured Gemini keys
+        self.gemini_api_key = gemini_keys().next_key()
         
         self.llm = GoogleGenerativeAI(
             model="gemini/gemini-1.5-flash",
@@ -457,7 +429,6 @@ class YouTubeContentCrew:
         self.analysis_tool = VideoAnalysisTool()
         
         self._setup_agents()
-        self._setup_crew()
     
     def _setup_agents(self):
         self.category_topic_decider = Agent(
@@ -508,8 +479,9 @@ class YouTubeContentCrew:
             llm=self.llm
         )
     
-    def _setup_crew(self):
-        self.crew = Crew(
+    def _build_crew(self, tasks: List[Task]) -> Crew:
+        # A fresh Crew per run so task lists are never shared between requests
+        return Crew(
             agents=[
                 self.category_topic_decider,
                 self.keyword_search_decider,
@@ -517,12 +489,68 @@ class YouTubeContentCrew:
                 self.content_analyzer,
                 self.marketing_strategist
             ],
-            tasks=[],
+            tasks=tasks,
             verbose=True,
             process=Process.sequential
         )
     
-    def _create_tasks(self, user_prompt: str, content_type: str, region_code: str):
+    def prefetch(self, user_prompt: str, content_type: str, region_code: str) -> Dict[str, Any]:
+        # Fast path: call both fetcher tools directly instead of through their agents
+        keyword, region_code, content_type = prefetch_arguments(user_prompt, content_type, region_code)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            trending = executor.submit(self.trending_tool._run, keyword, region_code, content_type)
+            search = executor.submit(self.search_tool._run, keyword, region_code, content_type)
+            return {
+                "keyword": keyword,
+                "trending": trending.result(),
+                "search": search.result()
+            }
+
+    def _create_tasks(self, user_prompt: str, content_type: str, region_code: str,
+                      prefetched: Optional[Dict[str, Any]] = None):
+        if prefetched is not None:
+            fetched_context = f"""
+            The fetch stage already ran for the keyword "{prefetched['keyword']}".
+            
+            TRENDING VIDEOS (youtube_trending_fetcher results):
+            {prefetched['context']['trending']}
+            
+            SEARCH VIDEOS (youtube_search_fetcher results):
+            {prefetched['context']['search']}
+            """
+            fetch_tasks = []
+        else:
+            fetched_context = ""
+            fetch_tasks = self._create_fetch_tasks(user_prompt, content_type, region_code)
+
+        # Task 3: Select the best videos from trending and search results (waits for tasks 1 and 2)
+        selection_task = Task(
+            description="""Review both the trending videos and search videos obtained in the previous tasks.
+            
+            From these two sets (10 trending videos + 10 search videos), select:
+            1. The single BEST trending video (high domain relevance, general appeal)
+            2. The single BEST search video (more niche, insightful but not as viral)
+            
+            For each selected video, explain:
+            - Why you selected it over the others
+            - What specific elements make it the best choice
+            - How it relates to the user's original prompt
+            
+            ALSO PASS THE REMAINING VIDEOS TOO AS OTHER SIMILAR VIDEOS
+            
+            Each video carries precomputed metrics with percentile_ranks (0-100) against earlier results from the same region and category. Compare videos on those ranks rather than on raw counts.
+            
+            IMPORTANT: Your output MUST include detailed justification for each selection. For the selection, only include video IDs, titles, and descriptions (not full metadata). Store all other metadata for later use.
+            """ + fetched_context,
+            expected_output="Selection of the best trending video and best search video with detailed justification and also the remaining videos as other similar videos",
+            agent=self.video_selector,
+            context=fetch_tasks or None
+        )
+        
+        return fetch_tasks + self._create_analysis_tasks(user_prompt, content_type, selection_task, fetch_tasks)
+
+    def _create_fetch_tasks(self, user_prompt: str, content_type: str, region_code: str) -> List[Task]:
         # Task 1: Determine categories, topics and fetch trending videos
         trending_task = Task(
             description=f"""Based on the user prompt: "{user_prompt}", determine:
@@ -538,7 +566,8 @@ class YouTubeContentCrew:
             """,
             expected_output="Analysis of the user prompt with category and region decisions plus trending video results",
             agent=self.category_topic_decider,
-            tools=[self.trending_tool]
+            tools=[self.trending_tool],
+            async_execution=True  # Runs alongside search_task; selection_task joins both
         )
         
         # Task 2: Determine search parameters and fetch search videos
@@ -556,31 +585,14 @@ class YouTubeContentCrew:
             """,
             expected_output="Analysis of the user prompt with category, search keyword, region, and date decisions plus search video results",
             agent=self.keyword_search_decider,
-            tools=[self.search_tool]
-        )
-        
-        # Task 3: Select the best videos from trending and search results
-        selection_task = Task(
-            description="""Review both the trending videos and search videos obtained in the previous tasks.
-            
-            From these two sets (10 trending videos + 10 search videos), select:
-            1. The single BEST trending video (high domain relevance, general appeal)
-            2. The single BEST search video (more niche, insightful but not as viral)
-            
-            For each selected video, explain:
-            - Why you selected it over the others
-            - What specific elements make it the best choice
-            - How it relates to the user's original prompt
-            
-            ALSO PASS THE REMAINING VIDEOS TOO AS OTHER SIMILAR VIDEOS
-            
-            IMPORTANT: Your output MUST include detailed justification for each selection. For the selection, only include video IDs, titles, and descriptions (not full metadata). Store all other metadata for later use.
-            """,
-            expected_output="Selection of the best trending video and best search video with detailed justification and also the remaining videos as other similar videos",
-            agent=self.video_selector,
-            context=[trending_task, search_task]
+            tools=[self.search_tool],
+            async_execution=True
         )
         
+        return [trending_task, search_task]
+
+    def _create_analysis_tasks(self, user_prompt: str, content_type: str, selection_task: Task,
+                               fetch_tasks: List[Task]) -> List[Task]:
         # Task 4: Perform deep analysis on the selected videos
         analysis_task = Task(
             description=f"""For each of the two selected videos, use the video_content_analyzer tool to perform a comprehensive analysis.
@@ -588,6 +600,7 @@ class YouTubeContentCrew:
             Make sure to:
             
             PASSING INPUT: You can now pass all the video ids as a array and get the result with the tool.
+            Pass the IDs of the top 2 selected videos as deep_video_ids; every other ID then gets metadata and statistics only.
             
             1. Use the content_type: {content_type} parameter when analyzing the videos
             2. Analyze all available metadata, statistics, and content
@@ -622,7 +635,7 @@ class YouTubeContentCrew:
                - Editing style and pacing
             
             2. Marketing Tactics:
-               - Recommended tags and keywords
+               - Recommended tags and keywords (already counted; leave recommended_tags_and_keywords as [] and use the counts below in your prose)
                - Title and description optimization
                - Thumbnail design recommendations
                - Best posting times and frequency
@@ -632,7 +645,6 @@ class YouTubeContentCrew:
                - How to measure effectiveness
                - Expected engagement patterns
                - Growth opportunities
-               - Count for each keyword among all 10 videos (Top 10 keywords)
                
             4. Video Organization:
                - Analyzed Videos: The 2 deeply analyzed videos
@@ -644,168 +656,174 @@ class YouTubeContentCrew:
                - Current trends identified
                - Future trend predictions
                
-            IMPORTANT NOTE: STRICTLY GENERATE ALL THE NUMERICALS IN INT EVEN THOUGH I HAVE USED QOUTES
+            IMPORTANT NOTE: STRICTLY GENERATE views, likes, comments, subscribers and views_per_day AS PLAIN INTEGERS, NOT STRINGS
             
             IMPORTANT: Your output should be in proper JSON format that the user can immediately use.
             Please respond ONLY in valid, parseable JSON format, no explanations or extra text. Ensure the JSON is well-formed and passes JSON linting.
             Whatever error happens, any tool malfunctions also don't give any response other than the JSON Data
             """,
-            expected_output="""{
-                "marketing_strategy": {
-                    "target_audience": "<Describe your target audience here>",
-                    "overall_goal": "<State your overall marketing goal here>",
-                    "content_recommendations": {
-                        "content_types": [
-                            "<Type of video/content 1>",
-                            "<Type of video/content 2>",
-                            "<Type of video/content 3>"
-                        ],
-                        "visual_style": "<Describe your desired visual style here>",
-                        "audio_music": "<Describe your audio/music requirements>",
-                        "storytelling_approach": "<Explain your storytelling style and tone>",
-                        "editing_style_and_pacing": "<Describe editing style, pacing, and duration goals>"
-                    },
-                    "marketing_tactics": {
-                        "recommended_tags_and_keywords": [
-                            ["<keyword1>",count],
-                            ["<keyword2>",count],
-                            ["<keyword3>",count]
-                        ],
-                        "title_and_description_optimization": "<Best practices for titles and descriptions>",
-                        "thumbnail_design_recommendations": "<Tips for thumbnail creation>",
-                        "best_posting_times_and_frequency": "<Your posting schedule recommendations>",
-                        "audience_engagement_strategies": "<How to drive engagement and foster community>"
-                    },
-                    "success_metrics": {
-                        "how_to_measure_effectiveness": "<Define your key performance indicators>",
-                        "expected_engagement_patterns": "<Expected engagement trends>",
-                        "growth_opportunities": "<Ideas for expanding reach and impact>"
-                    },
-                    "trend_analysis": {
-                        "current_trends": "<Current content trends identified in the analysis>",
-                        "future_predictions": "<Predictions about where these trends are heading>"
-                    },
-                    "videos": {
-                        "analyzed_videos": [
-                            {
-                                "video_id": "<Video ID of analyzed trending video>",
-                                "title": "<Video title>",
-                                "description": "<Video description>",
-                                "statistics": {
-                                    "views": <Number of views> STRICTLY INT,
-                                    "likes": <Number of likes> STRICTLY INT,
-                                    "comments": <Number of comments> STRICTLY INT,
-                                    "subscribers": <Channel subscriber count> STRICTLY INT,
-                                    "views_per_day": <Average views per day> STRICTLY INT,
-                                    "engagement_rate": <Engagement rate>  STRICTLY INT
-                                },
-                                "analysis": "<Key insights from deep content analysis>",
-                                "current_trends": "<Current trends this video follows>",
-                                "future_trends": "<Future trend predictions>",
-                                "video_url": "<Video URL>"
-                            },
-                            {
-                                "video_id": "<Video ID of analyzed search video>",
-                                "title": "<Video title>",
-                                "description": "<Video description>",
-                                "statistics": {
-                                    "views": <Number of views> STRICTLY INT,
-                                    "likes": <Number of likes> STRICTLY INT,
-                                    "comments": <Number of comments> STRICTLY INT,
-                                    "subscribers": <Channel subscriber count> STRICTLY INT,
-                                    "views_per_day": <Average views per day> STRICTLY INT,
-                                    "engagement_rate": <Engagement rate>  STRICTLY INT
-                                },
-                                "analysis": "<Key insights from deep content analysis>",
-                                "current_trends": "<Current trends this video follows>",
-                                "future_trends": "<Future trend predictions>",
-                                "video_url": "<Video URL>"
-                            }
-                        ],
-                        "top_matches": {
-                            "trending": [
-                                {
-                                    "video_id": "<Video ID>",
-                                    "title": "<Video title>",
-                                    "statistics": {
-                                        "views": <Number of views> STRICTLY INT,
-                                        "likes": <Number of likes> STRICTLY INT,
-                                        "comments": <Number of comments> STRICTLY INT,
-                                    },
-                                    "video_url": "<Video URL>"
-                                }
-                            ],
-                            "search": [
-                                {
-                                    "video_id": "<Video ID>",
-                                    "title": "<Video title>",
-                                    "statistics": {
-                                        "views": <Number of views> STRICTLY INT,
-                                        "likes": <Number of likes> STRICTLY INT,
-                                        "comments": <Number of comments> STRICTLY INT,
-                                    },
-                                    "video_url": "<Video URL>"
-                                }
-                            ]
-                        },
-                        "similar_content": [
-                            {
-                                "video_id": "<Video ID>",
-                                "title": "<Video title>",
-                                "statistics": {
-                                    "views": <Number of views> STRICTLY INT,
-                                    "likes": <Number of likes> STRICTLY INT,
-                                    "comments": <Number of comments> STRICTLY INT,
-                                },
-                                "video_url": "<Video URL>"
-                            }
-                        ],
-                        "trending_content": [
-                            {
-                                "video_id": "<Video ID>",
-                                "title": "<Video title>",
-                                "statistics": {
-                                     "views": <Number of views> STRICTLY INT,
-                                     "likes": <Number of likes> STRICTLY INT,
-                                     "comments": <Number of comments> STRICTLY INT,
-                                },
-                                "video_url": "<Video URL>"
-                            }
-                        ]
-                    }
-                }
-            }
-            Please respond ONLY in valid, parseable JSON format, no explanations or extra text. Ensure the JSON is well-formed and passes JSON linting.
+            # Field names and types only; the output is validated against the same schema
+            expected_output=f"""JSON matching this outline (values are types; lists show one element's shape):
+            {json.dumps(outline())}
             """,
             agent=self.marketing_strategist,
-            context=[trending_task, search_task, selection_task, analysis_task]
+            context=fetch_tasks + [selection_task, analysis_task]
         )
         
-        return [trending_task, search_task, selection_task, analysis_task, strategy_task]
+        return [selection_task, analysis_task, strategy_task]
     
-    def analyze_prompt(self, user_prompt: str, content_type: str, region_code: str) -> Dict[str, Any]:
-        tasks = self._create_tasks(user_prompt, content_type, region_code)
-        self.crew.tasks = tasks
-        result = self.crew.kickoff()
+    def analyze_prompt(self, user_prompt: str, content_type: str, region_code: str,
+                       on_stage: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None,
+                       fast: bool = False, prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Stage outputs are trimmed to a token budget before later stages read them
+        compactor = ContextCompactor() if STAGE_TOKEN_BUDGET > 0 else None
+        self.trending_tool.harvested.clear()
+        self.search_tool.harvested.clear()
+        keywords: List[List[Any]] = []
+
+        stages = STAGES
+        if prefetched is not None:
+            # Fetched outside this crew (the async app); its videos still feed the keyword counts
+            self.trending_tool.harvested.extend(prefetched["trending"].get("videos", []))
+            self.search_tool.harvested.extend(prefetched["search"].get("videos", []))
+        elif fast:
+            prefetched = self.prefetch(user_prompt, content_type, region_code)
+        if prefetched is not None:
+            stages = STAGES[2:]
+            prefetched["context"] = {}
+            for stage in ("trending", "search"):
+                fetched = json.dumps(prefetched[stage])
+                if compactor:
+                    fetched = compactor.compact(stage, fetched)
+                prefetched["context"][stage] = fetched
+                if on_stage:
+                    on_stage(stage, fetched, {"compaction": compactor.report.get(stage) if compactor else None})
+
+        def stage_callback(stage: str):
+            def callback(output):
+                info = {}
+                if stage == "selection":
+                    # Both fetchers are done: count keywords locally and hand the numbers to the strategist
+                    keywords[:] = keyword_counts(self.trending_tool.harvested + self.search_tool.harvested)
+                    strategy_task.description += f"""
+            
+            PRECOMPUTED KEYWORD COUNTS ([keyword, number of fetched videos using it], top {len(keywords)}):
+            {json.dumps(keywords)}
+            """
+                    info["keywords"] = keywords
+                # The final strategy output is returned as-is
+                if compactor and stage != "strategy":
+                    info["compaction"] = compactor.compact_output(stage, output)
+                if on_stage:
+                    on_stage(stage, output, info)
+            return callback
+
+        tasks = self._create_tasks(user_prompt, content_type, region_code, prefetched)
+        strategy_task = tasks[-1]
+        # Compact and report each stage as soon as its task finishes
+        for stage, task in zip(stages, tasks):
+            task.callback = stage_callback(stage)
+        result = self._build_crew(tasks).kickoff()
         
-        # Extract outputs from each task
-        outputs = {}
+        # Validate the strategy JSON, repairing fences, trailing commas and truncation locally
+        raw = getattr(strategy_task.output, "raw", None) or str(result)
         try:
-            for task in tasks:
-                if task.agent.role == "Marketing Strategy Expert":
-                    content = str(task.output)
-                    
-                    if content.startswith("```json"):
-                        content = re.sub(r"```json\s*", "", content)
-                        content = re.sub(r"```\s*$", "", content)
-            
-            content = json.loads(content)
-                    
-        except Exception as e:
-            print(f"Error extracting results: {str(e)}")
+            content = parse_strategy(raw)
+        except ValueError as e:
+            # Raised rather than returned, so callers and joined runs see a failure
+            raise StrategyParseError(f"Strategy output is not valid JSON: {str(e)}", raw) from e
         
+        # Counted locally rather than by the LLM
+        if isinstance(content.get("marketing_strategy"), dict):
+            content["marketing_strategy"].setdefault("marketing_tactics", {})["recommended_tags_and_keywords"] = keywords
         return content
 
+# Pool of ready-built crews, shared by the request threads of one worker.
+# Each crew is checked out by a single request at a time because its agents
+# and tools carry per-run state.
+class CrewPoolExhausted(Exception):
+    pass
+
+class CrewPool:
+    def __init__(self, size: int = int(os.getenv("CREW_POOL_SIZE", "4")),
+                 acquire_timeout: float = float(os.getenv("CREW_POOL_TIMEOUT", "600"))):
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self) -> Optional[YouTubeContentCrew]:
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return YouTubeContentCrew()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def warm_up(self):
+        while True:
+            crew = self._create()
+            if crew is None:
+                break
+            self._idle.put(crew)
+
+    @contextmanager
+    def acquire(self):
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self._create()
+            if crew is None:
+                try:
+                    crew = self._idle.get(timeout=self.acquire_timeout)
+                except queue.Empty:
+                    raise CrewPoolExhausted(f"No crew available within {self.acquire_timeout:g}s") from None
+        try:
+            yield crew
+        finally:
+            self._idle.put(crew)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+crew_pool = CrewPool()
+
+# Startup warm-up hook, called from gunicorn.conf.py once per worker
+def warm_up():
+    crew_pool.warm_up()
+    if TRENDING_REFRESH_ENABLED:
+        get_refresher().start()
+
+# Identical analyses that are already running are joined rather than started
+# again; every caller's on_stage sees the shared run's stages
+def run_analysis(user_prompt: str, content_type: str, region_code: str,
+                 on_stage: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None,
+                 fast: bool = False, on_join: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    flight = get_single_flight()
+    key = request_key(user_prompt, content_type, region_code, mode="fast" if fast else "crew")
+    def execute():
+        with crew_pool.acquire() as shorts_analyzer:
+            return shorts_analyzer.analyze_prompt(
+                user_prompt, content_type, region_code,
+                on_stage=lambda *event: flight.publish(key, *event), fast=fast
+            )
+    return flight.do(key, execute, listener=on_stage, on_join=on_join)
+
+def run_analysis_job(user_prompt: str, content_type: str, region_code: str, progress: Callable,
+                     fast: bool = False) -> Dict[str, Any]:
+    # A job that joined another worker's run gets no stage events, only this marker
+    return run_analysis(
+        user_prompt, content_type, region_code,
+        on_stage=lambda stage, output, info: progress(stage, info),
+        fast=fast,
+        on_join=lambda: progress("joined", {"joined_existing_run": True})
+    )
+
 # Main Flask route
 @app.route('/analyze-shorts', methods=['POST'])
 def analyze_shorts():
@@ -814,6 +832,7 @@ def analyze_shorts():
         user_prompt = data.get('prompt', '')
         content_type = data.get('content_type', '')
         region_code = data.get('region_code', '')
+        fast = bool(data.get('fast'))
         
         if not user_prompt:
             return jsonify({
@@ -821,15 +840,45 @@ def analyze_shorts():
                 'message': 'User prompt is required'
             }), 400
         
-        # Initialize YouTubeShortsCrew and analyze the prompt
-        shorts_analyzer = YouTubeContentCrew()
-        result = shorts_analyzer.analyze_prompt(user_prompt,content_type,region_code)
+        # Async mode: enqueue and hand back a job ID straight away
+        if data.get('async'):
+            try:
+                job_id = get_job_manager().submit(
+                    {'prompt': user_prompt, 'content_type': content_type, 'region_code': region_code, 'fast': fast},
+                    lambda progress: run_analysis_job(user_prompt, content_type, region_code, progress, fast=fast)
+                )
+            except JobQueueFull as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e)
+                }), 503
+            return jsonify({
+                'status': 'accepted',
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}'
+            }), 202
+        
+        # Borrow a pre-built crew (or join an identical run) and analyze the prompt
+        result = run_analysis(user_prompt, content_type, region_code, fast=fast)
         
         return jsonify({
             'status': 'success',
             'data': result
         })
     
+    except CrewPoolExhausted as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503
+    
+    except StrategyParseError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'raw_output': e.raw_output
+        }), 502
+    
     except Exception as e:
         import traceback
         return jsonify({
@@ -838,5 +887,128 @@ def analyze_shorts():
             'traceback': traceback.format_exc()
         }), 500
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+# Streaming variant: each stage's output is sent as soon as its task completes
+@app.route('/analyze-shorts/stream', methods=['POST'])
+def analyze_shorts_stream():
+    data = request.json or {}
+    user_prompt = data.get('prompt', '')
+    content_type = data.get('content_type', '')
+    region_code = data.get('region_code', '')
+    fast = bool(data.get('fast'))
+
+    if not user_prompt:
+        return jsonify({
+            'status': 'error',
+            'message': 'User prompt is required'
+        }), 400
+
+    events = queue.Queue()
+    started = time.time()
+    last_completed = [started]
+
+    def on_stage(stage, output, info):
+        now = time.time()
+        events.put(sse_event('stage', {
+            'stage': stage,
+            'output': getattr(output, 'raw', str(output)),
+            'elapsed_seconds': now - started,
+            'stage_seconds': now - last_completed[0],
+            **info
+        }))
+        last_completed[0] = now
+
+    def run():
+        try:
+            result = run_analysis(user_prompt, content_type, region_code, on_stage=on_stage, fast=fast)
+            events.put(sse_event('result', {
+                'status': 'success',
+                'data': result,
+                'elapsed_seconds': time.time() - started
+            }))
+        except Exception as e:
+            events.put(sse_event('error', {
+                'status': 'error',
+                'message': str(e),
+                'raw_output': getattr(e, 'raw_output', None)
+            }))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def generate():
+        yield sse_event('started', {'stages': STAGES})
+        while True:
+            try:
+                event = events.get(timeout=15)
+            except queue.Empty:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield event
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_manager().store.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found or expired'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'stages': job['stages'],
+            'stages_total': len(STAGES),
+            'result': job['result'],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at'],
+            'expires_at': job['expires_at']
+        }
+    })
+
+@app.route('/quota', methods=['GET'])
+def quota():
+    return jsonify({
+        'status': 'success',
+        'data': quota_status()
+    })
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'youtube_latency': latency_stats(),
+            'youtube_cache': cache_stats(),
+            'analysis_cache': get_analysis_cache().stats(),
+            'crew_pool': crew_pool.stats(),
+            'jobs': get_job_manager().stats(),
+            'single_flight': get_single_flight().stats(),
+            'context_compaction': compaction_stats(),
+            'trending_refresher': get_refresher().stats(),
+            'search_index': get_search_index().stats(),
+            'gemini': gemini_stats(),
+            'api_keys': {
+                'youtube': key_stats(),
+                'gemini': gemini_keys().stats()
+            }
+        }
+    })
+
 if __name__ == '__main__':
     app.run(debug=True,host='0.0.0.0',port=10000)
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+import asyncio
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route, Mount
+
+from app import (
+    app as flask_app, crew_pool, CrewPoolExhausted, run_analysis, run_analysis_job, warm_up,
+    prefetch_arguments, YouTubeTrendingTool, YouTubeSearchTool,
+)
+from jobs import JobQueueFull, get_job_manager
+from singleflight import request_key, get_single_flight
+from strategy import StrategyParseError
+
+# Async serving mode: gunicorn asgi:app -k uvicorn.workers.UvicornWorker (or uvicorn asgi:app).
+# Every route other than /analyze-shorts is served by the Flask app unchanged.
+#
+# Only fast mode ("fast": true) fetches from YouTube without blocking: the
+# prefetch runs on the event loop and only the LLM stages take a crew thread.
+# The default mode runs the whole synchronous crew, whose agents call the
+# fetch tools themselves, on one crew thread per request; its YouTube calls
+# block that thread. Both modes share the thread pool below, sized to the
+# crew pool (CREW_POOL_SIZE, 4 by default), so at most that many analyses run
+# at once per worker while the rest wait without holding a thread.
+CREW_THREADS = int(os.getenv("ASYNC_CREW_THREADS", str(crew_pool.size)))
+crew_executor = ThreadPoolExecutor(max_workers=CREW_THREADS, thread_name_prefix="crew")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+# Identical requests in this worker await one run; SingleFlight still joins other workers
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def prefetch_async(user_prompt: str, content_type: str, region_code: str) -> Dict[str, Any]:
+    # Fresh tool instances: nothing is shared with the pooled crews
+    keyword, region_code, content_type = prefetch_arguments(user_prompt, content_type, region_code)
+    trending, search = await asyncio.gather(
+        YouTubeTrendingTool()._arun(keyword, region_code, content_type),
+        YouTubeSearchTool()._arun(keyword, region_code, content_type)
+    )
+    return {"keyword": keyword, "trending": trending, "search": search}
+
+
+async def execute_analysis(user_prompt: str, content_type: str, region_code: str, fast: bool) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    if not fast:
+        # Agents drive the fetch tools themselves, inside the crew thread, so
+        # this path's YouTube calls block; only the wait for a thread is async
+        return await loop.run_in_executor(
+            crew_executor, lambda: run_analysis(user_prompt, content_type, region_code)
+        )
+
+    prefetched = await prefetch_async(user_prompt, content_type, region_code)
+
+    key = request_key(user_prompt, content_type, region_code, mode="fast")
+    def execute():
+        with crew_pool.acquire() as shorts_analyzer:
+            # Published so a job that joins this run still sees its stages
+            return shorts_analyzer.analyze_prompt(
+                user_prompt, content_type, region_code, fast=True, prefetched=prefetched,
+                on_stage=lambda *event: get_single_flight().publish(key, *event)
+            )
+    return await loop.run_in_executor(crew_executor, lambda: get_single_flight().do(key, execute))
+
+
+async def analyze(user_prompt: str, content_type: str, region_code: str, fast: bool) -> Dict[str, Any]:
+    key = request_key(user_prompt, content_type, region_code, mode="fast" if fast else "crew")
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(execute_analysis(user_prompt, content_type, region_code, fast))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # A disconnecting client must not cancel the run others are waiting on
+    return await asyncio.shield(future)
+
+
+# Same request and response contract as the Flask route
+async def analyze_shorts(request: Request):
+    if request.method == 'OPTIONS':
+        return Response(status_code=200, headers=CORS_HEADERS)
+    try:
+        data = await request.json()
+        user_prompt = data.get('prompt', '')
+        content_type = data.get('content_type', '')
+        region_code = data.get('region_code', '')
+        fast = bool(data.get('fast'))
+
+        if not user_prompt:
+            return JSONResponse({
+                'status': 'error',
+                'message': 'User prompt is required'
+            }, status_code=400, headers=CORS_HEADERS)
+
+        if data.get('async'):
+            try:
+                # The job store is SQLite (opened on first use); keep it off the event loop
+                job_id = await asyncio.to_thread(lambda: get_job_manager().submit(
+                    {'prompt': user_prompt, 'content_type': content_type, 'region_code': region_code, 'fast': fast},
+                    lambda progress: run_analysis_job(user_prompt, content_type, region_code, progress, fast=fast)
+                ))
+            except JobQueueFull as e:
+                return JSONResponse({
+                    'status': 'error',
+                    'message': str(e)
+                }, status_code=503, headers=CORS_HEADERS)
+            return JSONResponse({
+                'status': 'accepted',
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}'
+            }, status_code=202, headers=CORS_HEADERS)
+
+        result = await analyze(user_prompt, content_type, region_code, fast)
+
+        return JSONResponse({
+            'status': 'success',
+            'data': result
+        }, headers=CORS_HEADERS)
+
+    except CrewPoolExhausted as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status_code=503, headers=CORS_HEADERS)
+
+    except StrategyParseError as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e),
+            'raw_output': e.raw_output
+        }, status_code=502, headers=CORS_HEADERS)
+
+    except Exception as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }, status_code=500, headers=CORS_HEADERS)
+
+
+@asynccontextmanager
+async def lifespan(_):
+    # gunicorn's post_worker_init already warms up; this covers running under uvicorn directly
+    await asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/analyze-shorts', analyze_shorts, methods=['POST', 'OPTIONS']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=10000)
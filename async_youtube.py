@@ -0,0 +1,146 @@
+import time
+import asyncio
+import threading
+from typing import Dict, List, Any, Optional
+
+import httpx
+
+from keys import youtube_keys, NoKeyAvailable
+from normalize import build_video_records
+from youtube_client import (
+    YOUTUBE_API_BASE, POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES, RETRY_STATUS_CODES,
+    SEARCH_MAX_PAGES, SEARCH_MAX_QUOTA, VIDEO_BATCH_SIZE, KeyRotation, SearchPages,
+    get_client, charge_key, cached_response, store_response, plan_video_fetch, store_static_videos,
+    merge_statistics, ordered_items, check_error,
+)
+
+
+class AsyncYouTubeClient:
+    # Non-blocking counterpart of YouTubeClient for the ASGI app. Keys, quota,
+    # caching and latency stats are shared with the synchronous client.
+    def __init__(self, pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, max_retries: int = MAX_RETRIES):
+        self.max_retries = max_retries
+        self.sync_client = get_client()
+        self.stats = self.sync_client.stats
+        # Requests past the pool size wait here: httpcore rescans every connection
+        # for each request queued in its own pool, which gets slow under load
+        self.slots = asyncio.Semaphore(pool_size)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def _request(self, endpoint: str, params: Dict[str, Any], etag: Optional[str] = None):
+        url = f"{YOUTUBE_API_BASE}/{endpoint}"
+        headers = {"If-None-Match": etag} if etag else None
+        start = time.perf_counter()
+        status = None
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    async with self.slots:
+                        response = await self.client.get(url, params=params, headers=headers)
+                    status = response.status_code
+                    if status == 304:
+                        return None, status
+                    if status in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        await asyncio.sleep(self.sync_client._backoff(attempt, response.headers.get("Retry-After")))
+                        attempt += 1
+                        continue
+                    return response.json(), status
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        raise
+                    await asyncio.sleep(self.sync_client._backoff(attempt))
+                    attempt += 1
+        finally:
+            self.stats.record(endpoint, time.perf_counter() - start, status, attempt)
+
+    async def get(self, endpoint: str, params: Dict[str, Any], etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # The quota check can wait on the rate limiter, so it runs off the event loop
+        if params.get("key"):
+            await asyncio.to_thread(charge_key, endpoint, params["key"])
+            return (await self._request(endpoint, params, etag))[0]
+
+        pool = youtube_keys()
+        rotation = KeyRotation(pool)
+        while True:
+            try:
+                async with pool.acquire_async(exclude=rotation.tried) as api_key:
+                    if not await asyncio.to_thread(rotation.charge, endpoint, api_key):
+                        continue
+                    data, status = await self._request(endpoint, dict(params, key=api_key), etag)
+                    if rotation.accept(api_key, data, status):
+                        return data
+            except NoKeyAvailable as e:
+                return rotation.give_up(e)
+
+
+# httpx clients belong to the event loop that created them
+_clients: Dict[int, AsyncYouTubeClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_async_client() -> AsyncYouTubeClient:
+    loop_id = id(asyncio.get_running_loop())
+    with _clients_lock:
+        client = _clients.get(loop_id)
+        if client is None:
+            client = _clients[loop_id] = AsyncYouTubeClient()
+        return client
+
+
+async def youtube_get_async(endpoint: str, params: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+    # The cache and quota-pressure checks may hit SQLite, so they run off the event loop
+    cached, stale = await asyncio.to_thread(cached_response, endpoint, params, use_cache)
+    if cached is not None:
+        return cached
+    data = await get_async_client().get(endpoint, params, etag=stale.get("etag") if stale else None)
+    return await asyncio.to_thread(store_response, endpoint, params, data, stale, use_cache)
+
+
+async def fetch_videos_async(video_ids: List[str], parts: str) -> List[Dict[str, Any]]:
+    # Same plan as fetch_videos; the full and statistics-only batches run concurrently
+    plan = await asyncio.to_thread(plan_video_fetch, video_ids, parts)
+    if plan is None:
+        data = await youtube_get_async("videos", {"part": parts, "id": ",".join(video_ids)})
+        check_error(data, "YouTube videos lookup failed")
+        return ordered_items(video_ids, {item.get("id"): item for item in data.get("items", [])})
+
+    items, known, missing = plan
+    full = [missing[i:i + VIDEO_BATCH_SIZE] for i in range(0, len(missing), VIDEO_BATCH_SIZE)]
+    refresh = [known[i:i + VIDEO_BATCH_SIZE] for i in range(0, len(known), VIDEO_BATCH_SIZE)]
+    responses = await asyncio.gather(
+        *[youtube_get_async("videos", {"part": parts, "id": ",".join(batch)}, use_cache=False) for batch in full],
+        *[youtube_get_async("videos", {"part": "statistics", "id": ",".join(batch)}) for batch in refresh]
+    )
+
+    for data in responses[:len(full)]:
+        check_error(data, "YouTube videos lookup failed")
+        await asyncio.to_thread(store_static_videos, items, data, parts)
+    for batch, data in zip(refresh, responses[len(full):]):
+        check_error(data, "YouTube statistics refresh failed")
+        await asyncio.to_thread(merge_statistics, items, data, batch)
+    return ordered_items(video_ids, items)
+
+
+async def collect_video_records_async(search_params: Dict[str, Any], parts: str, content_type: str,
+                                      limit: int = 10, max_pages: int = SEARCH_MAX_PAGES,
+                                      max_quota: int = SEARCH_MAX_QUOTA) -> List[Dict[str, Any]]:
+    # iter_video_pages + collect_video_records: stops paging once `limit` records match
+    records: List[Dict[str, Any]] = []
+    pages = SearchPages(search_params, max_pages, max_quota)
+    while True:
+        params = pages.next_search()
+        if params is None:
+            return records
+        for batch in pages.video_batches(await youtube_get_async("search", params)):
+            if not pages.charge_videos():
+                return records
+            items = await fetch_videos_async(batch, parts)
+            records.extend(build_video_records(items, content_type, limit=limit - len(records)))
+            if len(records) >= limit:
+                return records
@@ -0,0 +1,76 @@
+# Parity check: the shared duration parser agrees with the old per-item string
+# splitting on every shape the old parser handled. Timings are printed for
+# reference only; on shared machines they swing too much to gate on. Unit
+# tests for the formats the old parser could not read are in tests/test_normalize.py.
+# Run with: python bench_normalize.py [items] [page_size]
+import sys
+import time
+import random
+
+from normalize import parse_duration, parse_durations, _parse_duration_regex
+
+
+def legacy_parse_duration(duration):
+    # The parser previously copy-pasted into each tool (ignores hours)
+    seconds = 0
+    if "PT" in duration:
+        if "M" in duration:
+            minutes_part = duration.split("PT")[1].split("M")[0]
+            seconds += int(minutes_part) * 60
+        if "S" in duration:
+            if "M" in duration:
+                seconds_part = duration.split("M")[1].split("S")[0]
+            else:
+                seconds_part = duration.split("PT")[1].split("S")[0]
+            seconds += int(seconds_part)
+    return seconds
+
+
+def sample_durations(count):
+    # Shapes the legacy parser can handle, so both sides do equivalent work
+    rng = random.Random(42)
+    durations = []
+    for _ in range(count):
+        minutes, seconds = rng.randint(0, 59), rng.randint(1, 59)
+        if minutes and rng.random() < 0.7:
+            durations.append(f"PT{minutes}M{seconds}S")
+        elif minutes:
+            durations.append(f"PT{minutes}M")
+        else:
+            durations.append(f"PT{seconds}S")
+    return durations
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    durations = sample_durations(count)
+    pages = [durations[i:i + page_size] for i in range(0, count, page_size)]
+
+    assert [legacy_parse_duration(d) for d in durations] == parse_durations(durations)
+    assert [legacy_parse_duration(d) for d in durations] == [parse_duration(d) for d in durations]
+
+    # CPU time, best of many interleaved rounds: wall-clock timings on shared machines swing too much
+    runs = 30
+    timings = {"legacy": float("inf"), "regex": float("inf"), "shared": float("inf")}
+    for _ in range(runs):
+        for name, parse_page in (
+            ("legacy", lambda page: [legacy_parse_duration(d) for d in page]),
+            ("regex", lambda page: [_parse_duration_regex(d) for d in page]),
+            ("shared", parse_durations),
+        ):
+            start = time.process_time()
+            for page in pages:
+                parse_page(page)
+            timings[name] = min(timings[name], time.process_time() - start)
+    legacy, regex, shared = timings["legacy"], timings["regex"], timings["shared"]
+
+    print(f"{count} durations in pages of {page_size}, best of {runs}")
+    print(f"  legacy split parser : {legacy * 1000:8.2f} ms")
+    print(f"  regex only          : {regex * 1000:8.2f} ms")
+    print(f"  parse_durations     : {shared * 1000:8.2f} ms  ({shared / legacy:.2f}x legacy)")
+    print("parity: ok")
+
+
+if __name__ == "__main__":
+    main()
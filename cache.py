@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Union
+
+from storage import SQLiteStore, Singleton
+
+# Per-endpoint freshness in seconds; search results go stale fastest
+DEFAULT_TTLS = {
+    "search": 900,
+    "videos": 3600,
+    "commentThreads": 3600,
+    "channels": 86400,
+}
+DEFAULT_TTL = 900
+
+MEMORY_MAX_ENTRIES = int(os.getenv("YOUTUBE_CACHE_SIZE", "1024"))
+DISK_MAX_ENTRIES = int(os.getenv("YOUTUBE_CACHE_DB_MAX_ROWS", "50000"))
+
+# Request params that never change the response and must not leak into keys
+EXCLUDED_PARAMS = {"key"}
+
+
+def endpoint_ttl(endpoint: str) -> float:
+    # e.g. YOUTUBE_CACHE_TTL_SEARCH=300, YOUTUBE_CACHE_TTL_COMMENTTHREADS=600
+    override = os.getenv(f"YOUTUBE_CACHE_TTL_{endpoint.upper()}")
+    if override:
+        return float(override)
+    return DEFAULT_TTLS.get(endpoint, DEFAULT_TTL)
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    normalized = {}
+    for name, value in params.items():
+        if name in EXCLUDED_PARAMS or value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)
+        normalized[name] = str(value).strip()
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return f"{endpoint}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+class DiskCache(SQLiteStore):
+    def __init__(self, path: str, max_entries: int = DISK_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        conn.commit()
+
+    def get(self, key: str):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, stored_at, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def touch(self, key: str):
+        # Marks a real hit for LRU eviction; plain reads leave accessed_at alone
+        conn = self._conn()
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+
+    def put(self, key: str, endpoint: str, value: Any, stored_at: float, expires_at: float) -> int:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, value, stored_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, json.dumps(value), stored_at, expires_at, stored_at)
+        )
+        conn.commit()
+
+        # Check the size bound every so often rather than on every write
+        self._writes += 1
+        if self._writes % 100 == 0:
+            return self.evict()
+        return 0
+
+    def delete(self, key: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        conn.commit()
+
+    def evict(self) -> int:
+        conn = self._conn()
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+            (overflow,)
+        )
+        conn.commit()
+        return overflow
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskCache(db_path) if db_path else None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _lookup(self, key: str, now: float):
+        # Returns (entry, tier) for the freshest copy held anywhere
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        # Another worker may have refreshed an entry that is stale in memory
+        if (entry is None or now >= entry[2]) and self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error:
+                row = None
+            if row is not None:
+                entry = tuple(row)
+                self._remember(key, entry)
+                return entry, "disk"
+        return entry, "memory"
+
+    def get(self, endpoint: str, params: Dict[str, Any],
+            allow_stale: Union[bool, Callable[[], bool]] = False) -> Optional[Dict[str, Any]]:
+        # allow_stale may be a callable, asked only when the stored copy has expired
+        now = time.time()
+        key = cache_key(endpoint, params)
+        entry, tier = self._lookup(key, now)
+
+        if entry is not None:
+            value, stored_at, expires_at = entry
+            if now < expires_at:
+                self._count(f"{tier}_hits")
+                if tier == "disk":
+                    try:
+                        self.disk.touch(key)
+                    except sqlite3.Error:
+                        pass
+                return value
+            if allow_stale() if callable(allow_stale) else allow_stale:
+                self._count("stale_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def peek(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Any stored copy, expired or not, without counting a lookup; used to
+        # revalidate with the response's ETag
+        entry, _ = self._lookup(cache_key(endpoint, params), time.time())
+        return entry[0] if entry is not None else None
+
+    def revalidated(self, endpoint: str, params: Dict[str, Any], value: Dict[str, Any]):
+        # The API answered 304 Not Modified: keep the stored copy for another TTL
+        self.put(endpoint, params, value)
+        self._count("revalidated")
+
+    def put(self, endpoint: str, params: Dict[str, Any], value: Dict[str, Any], ttl: Optional[float] = None):
+        # Error payloads are never cached
+        if not isinstance(value, dict) or "error" in value:
+            return
+        key = cache_key(endpoint, params)
+        stored_at = time.time()
+        expires_at = stored_at + (endpoint_ttl(endpoint) if ttl is None else ttl)
+        self._remember(key, (value, stored_at, expires_at))
+        self._count("stores")
+
+        if self.disk is not None:
+            try:
+                evicted = self.disk.put(key, endpoint, value, stored_at, expires_at)
+                if evicted:
+                    self._count("evictions", evicted)
+            except sqlite3.Error:
+                pass
+
+    def delete(self, endpoint: str, params: Dict[str, Any]):
+        key = cache_key(endpoint, params)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            try:
+                self.disk.delete(key)
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["stale_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0
+        stats["disk_enabled"] = self.disk is not None
+        return stats
+
+
+_cache = Singleton(lambda: ResponseCache(db_path=os.getenv("YOUTUBE_CACHE_DB")))
+
+
+def get_cache() -> ResponseCache:
+    return _cache.get()
@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+from typing import Dict, Any, List, Set
+
+# Rough size of the context handed from one stage to the next
+STAGE_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+DESCRIPTION_CHARS = int(os.getenv("CONTEXT_DESCRIPTION_CHARS", "200"))
+ANALYSIS_CHARS = int(os.getenv("CONTEXT_ANALYSIS_CHARS", "1500"))
+MAX_TAGS = 10
+MAX_COMMENTS = 3
+
+# Fields later stages never use, or that repeat another field
+REDUNDANT_FIELDS = {
+    "tag_count", "duration_formatted", "kind", "etag", "thumbnails", "localized",
+    "channel_id", "brandingSettings", "topicDetails", "liveBroadcastContent", "baseline",
+}
+LONG_TEXT_FIELDS = {"description": DESCRIPTION_CHARS, "content_analysis": ANALYSIS_CHARS, "analysis": ANALYSIS_CHARS}
+
+_decoder = json.JSONDecoder()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English + JSON
+    return (len(text) + 3) // 4
+
+
+def _trim(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + "..."
+
+
+class ContextCompactor:
+    def __init__(self, budget_tokens: int = STAGE_TOKEN_BUDGET):
+        self.budget_tokens = budget_tokens
+        # Keys already passed along for each video, across all stages of the run
+        self._seen: Dict[str, Set[str]] = {}
+        self.report: Dict[str, Dict[str, int]] = {}
+        # Parallel stages finish on different threads
+        self._lock = threading.Lock()
+
+    def _compact_value(self, value: Any, text_limits: Dict[str, int]) -> Any:
+        if isinstance(value, list):
+            return [self._compact_value(item, text_limits) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        compacted = {}
+        for name, item in value.items():
+            if name in REDUNDANT_FIELDS:
+                continue
+            if name in text_limits and isinstance(item, str):
+                item = _trim(item, text_limits[name])
+            elif name == "tags" and isinstance(item, list):
+                item = item[:MAX_TAGS]
+            elif name == "comments" and isinstance(item, list):
+                item = item[:MAX_COMMENTS]
+            compacted[name] = self._compact_value(item, text_limits)
+
+        # A video whose fields were all passed on before collapses to a reference
+        video_id = compacted.get("video_id")
+        if isinstance(video_id, str):
+            keys = set(compacted)
+            seen = self._seen.get(video_id)
+            if seen is not None and keys <= seen:
+                return {"video_id": video_id, "title": compacted.get("title"), "duplicate_of_earlier_stage": True}
+            self._seen[video_id] = (seen or set()) | keys
+        return compacted
+
+    def _compact_json_segments(self, text: str, text_limits: Dict[str, int]) -> str:
+        # Rewrite every embedded JSON object/array; prose between them is kept
+        parts: List[str] = []
+        index = 0
+        cursor = 0
+        while index < len(text):
+            if text[index] in "{[":
+                try:
+                    value, end = _decoder.raw_decode(text, index)
+                except ValueError:
+                    index += 1
+                    continue
+                if isinstance(value, (dict, list)) and value:
+                    parts.append(text[cursor:index])
+                    parts.append(json.dumps(self._compact_value(value, text_limits), separators=(",", ":")))
+                    cursor = end
+                index = end
+            else:
+                index += 1
+        parts.append(text[cursor:])
+        return "".join(parts)
+
+    def compact(self, stage: str, text: str) -> str:
+        with self._lock:
+            return self._compact(stage, text)
+
+    def _compact(self, stage: str, text: str) -> str:
+        before = estimate_tokens(text)
+        snapshot = {video_id: set(keys) for video_id, keys in self._seen.items()}
+
+        compacted = self._compact_json_segments(text, LONG_TEXT_FIELDS)
+        if estimate_tokens(compacted) > self.budget_tokens:
+            # Tighter second pass over the original text before falling back to truncation
+            self._seen = snapshot
+            tight = {name: limit // 3 for name, limit in LONG_TEXT_FIELDS.items()}
+            compacted = self._compact_json_segments(text, tight)
+        if estimate_tokens(compacted) >= before:
+            compacted = text
+        if estimate_tokens(compacted) > self.budget_tokens:
+            limit = self.budget_tokens * 4
+            compacted = compacted[:limit] + f"\n...[truncated {len(compacted) - limit} characters]"
+
+        after = estimate_tokens(compacted)
+        self.report[stage] = {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
+        _record(stage, before - after)
+        return compacted
+
+    def compact_output(self, stage: str, output: Any) -> Dict[str, int]:
+        # Rewrites a CrewAI TaskOutput in place; downstream tasks read output.raw as context
+        raw = getattr(output, "raw", None)
+        if not isinstance(raw, str):
+            return {}
+        output.raw = self.compact(stage, raw)
+        return self.report[stage]
+
+
+_totals: Dict[str, Dict[str, int]] = {}
+_totals_lock = threading.Lock()
+
+
+def _record(stage: str, saved: int):
+    with _totals_lock:
+        totals = _totals.setdefault(stage, {"runs": 0, "tokens_saved": 0})
+        totals["runs"] += 1
+        totals["tokens_saved"] += saved
+
+
+def compaction_stats() -> Dict[str, Dict[str, int]]:
+    with _totals_lock:
+        return {stage: dict(totals) for stage, totals in _totals.items()}
@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from keys import gemini_keys
+
+# Deep-analysis prompts in flight at once within one batch
+GEMINI_BATCH_CONCURRENCY = int(os.getenv("GEMINI_BATCH_CONCURRENCY", "4"))
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "quota" in message.lower()
+
+
+class LLMStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, model: str, elapsed: float, usage: Optional[Dict[str, Any]], failed: bool):
+        usage = usage or {}
+        with self._lock:
+            stats = self._models.setdefault(model, {
+                "calls": 0,
+                "errors": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            })
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for model, stats in self._models.items():
+                entry = dict(stats)
+                entry["avg_seconds"] = stats["total_seconds"] / stats["calls"] if stats["calls"] else 0
+                result[model] = entry
+            return result
+
+
+llm_stats = LLMStats()
+
+# One client per model and key for the life of the process
+_clients: Dict[Tuple[str, str], ChatGoogleGenerativeAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_chat_model(model: str, api_key: str) -> ChatGoogleGenerativeAI:
+    with _clients_lock:
+        client = _clients.get((model, api_key))
+        if client is None:
+            client = _clients[(model, api_key)] = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=0
+            )
+        return client
+
+
+def batch_invoke(model: str, prompts: List[List[BaseMessage]],
+                 max_concurrency: int = GEMINI_BATCH_CONCURRENCY) -> List[Union[str, Exception]]:
+    # Sends every prompt through the client's batch interface; each entry is
+    # the response text or the exception for that prompt
+    if not prompts:
+        return []
+    pool = gemini_keys()
+
+    def timed_invoke(messages: List[BaseMessage]):
+        # A key per prompt, so every call in flight counts against its key's concurrency cap
+        with pool.acquire() as api_key:
+            start = time.perf_counter()
+            response = None
+            try:
+                response = get_chat_model(model, api_key).invoke(messages)
+                return response
+            except Exception as e:
+                # Rest a key that hit its quota or rate limit
+                if is_rate_limit_error(e):
+                    pool.cool_down(api_key)
+                raise
+            finally:
+                llm_stats.record(model, time.perf_counter() - start,
+                                 getattr(response, "usage_metadata", None), response is None)
+
+    responses = RunnableLambda(timed_invoke).batch(
+        prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True
+    )
+    return [response if isinstance(response, Exception) else response.content for response in responses]
+
+
+def gemini_stats() -> Dict[str, Dict[str, Any]]:
+    return llm_stats.snapshot()
@@ -0,0 +1,12 @@
+# Loaded automatically by gunicorn from the working directory
+import os
+
+# More than one thread switches gunicorn to gthread workers; requests in a
+# worker share its crew pool
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+
+def post_worker_init(worker):
+    # Build the crew pool before the worker starts taking requests
+    from app import warm_up
+    warm_up()
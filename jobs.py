@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, List
+
+from storage import SQLiteStore, Singleton, data_path
+
+JOBS_DB = data_path("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "20"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore(SQLiteStore):
+    # Job state lives in SQLite so any gunicorn worker can answer GET /jobs/<id>
+    def __init__(self, path: str = JOBS_DB, ttl: float = JOB_RESULT_TTL):
+        super().__init__(path)
+        self.ttl = ttl
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def create(self, request: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO jobs (id, status, request, stages, created_at, updated_at, expires_at) "
+            "VALUES (?, 'queued', ?, '[]', ?, ?, ?)",
+            (job_id, json.dumps(request), now, now, now + self.ttl)
+        )
+        conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        now = time.time()
+        fields["updated_at"] = now
+        # Results stay readable for the TTL counted from their last update
+        fields["expires_at"] = now + self.ttl
+        for name in ("stages", "result"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._conn()
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self.purge_expired()
+        row = self._conn().execute(
+            "SELECT id, status, request, stages, result, error, created_at, updated_at, expires_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "request": json.loads(row[2]),
+            "stages": json.loads(row[3]),
+            "result": json.loads(row[4]) if row[4] is not None else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+            "expires_at": row[8],
+        }
+
+    def purge_expired(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+        conn.commit()
+
+
+class JobManager:
+    def __init__(self, store: JobStore, max_workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT):
+        self.store = store
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, request: Dict[str, Any], fn: Callable[..., Any]) -> str:
+        # fn(progress) runs the job; progress(stage, info) records a finished stage
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                raise JobQueueFull(f"Too many queued analyses (limit {self.queue_limit})")
+            self._pending += 1
+
+        job_id = self.store.create(request)
+        try:
+            self._executor.submit(self._run, job_id, fn)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., Any]):
+        stages: List[Dict[str, Any]] = []
+        started = time.time()
+
+        def progress(stage: str, info: Optional[Dict[str, Any]] = None):
+            entry = {"stage": stage, "completed_at": time.time(), "elapsed_seconds": time.time() - started}
+            entry.update(info or {})
+            stages.append(entry)
+            self.store.update(job_id, stages=stages)
+
+        try:
+            self.store.update(job_id, status="running")
+            result = fn(progress)
+            self.store.update(job_id, status="succeeded", result=result, stages=stages)
+        except Exception as e:
+            self.store.update(job_id, status="failed", error=str(e), stages=stages)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": self._pending, "queue_limit": self.queue_limit}
+
+
+# Built on first use, so importing the app creates no database
+_job_manager = Singleton(lambda: JobManager(JobStore()))
+
+
+def get_job_manager() -> JobManager:
+    return _job_manager.get()
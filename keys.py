@@ -0,0 +1,187 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, List, Any, Optional, Iterable
+
+KEY_CONCURRENCY = int(os.getenv("API_KEY_CONCURRENCY", "8"))
+KEY_COOLDOWN = float(os.getenv("API_KEY_COOLDOWN", "300"))
+KEY_ACQUIRE_TIMEOUT = float(os.getenv("API_KEY_ACQUIRE_TIMEOUT", "30"))
+KEY_STRATEGY = os.getenv("API_KEY_STRATEGY", "least_loaded")  # or round_robin
+
+
+class NoKeyAvailable(Exception):
+    pass
+
+
+def load_keys(name: str) -> List[str]:
+    # NAME_API_KEYS (comma-separated), NAME_API_KEYS_FILE (one per line), then NAME_API_KEY
+    keys: List[str] = []
+    listed = os.getenv(f"{name}_API_KEYS")
+    if listed:
+        keys.extend(listed.split(","))
+    path = os.getenv(f"{name}_API_KEYS_FILE")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            keys.extend(line for line in f.read().splitlines() if not line.startswith("#"))
+    single = os.getenv(f"{name}_API_KEY")
+    if single:
+        keys.append(single)
+    return list(dict.fromkeys(key.strip() for key in keys if key.strip()))
+
+
+def fingerprint(api_key: Optional[str]) -> str:
+    # Keys are never stored or reported; stats and quota usage use a short fingerprint
+    if not api_key:
+        return "default"
+    return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class _KeyState:
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.uses = 0
+        self.failures = 0
+        self.cooling_until = 0.0
+
+
+class KeyPool:
+    def __init__(self, name: str, keys: List[str], max_concurrency: int = KEY_CONCURRENCY,
+                 cooldown: float = KEY_COOLDOWN, strategy: str = KEY_STRATEGY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.cooldown = cooldown
+        self.strategy = strategy
+        self._states = [_KeyState(key) for key in keys]
+        self._next = 0
+        self._cond = threading.Condition()
+
+    @property
+    def keys(self) -> List[str]:
+        return [state.key for state in self._states]
+
+    def _pick(self, exclude: Iterable[str]) -> Optional[_KeyState]:
+        now = time.time()
+        excluded = set(exclude)
+        ready = [
+            state for state in self._states
+            if state.key not in excluded and state.cooling_until <= now and state.in_flight < self.max_concurrency
+        ]
+        if not ready:
+            return None
+        if self.strategy == "round_robin":
+            # First ready key at or after the rotating cursor
+            count = len(self._states)
+            for offset in range(count):
+                state = self._states[(self._next + offset) % count]
+                if state in ready:
+                    self._next = (self._states.index(state) + 1) % count
+                    return state
+        return min(ready, key=lambda state: (state.in_flight, state.uses))
+
+    def _usable(self, exclude: Iterable[str]) -> bool:
+        excluded = set(exclude)
+        return any(state.key not in excluded for state in self._states)
+
+    @contextmanager
+    def acquire(self, exclude: Iterable[str] = (), timeout: float = KEY_ACQUIRE_TIMEOUT):
+        exclude = tuple(exclude)
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                if not self._usable(exclude):
+                    raise NoKeyAvailable(f"No {self.name} API key available")
+                state = self._pick(exclude)
+                if state is not None:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise NoKeyAvailable(f"All {self.name} API keys are busy or cooling down")
+                # Wake up for released keys, or when the earliest cool-down ends
+                cooling = [s.cooling_until - time.time() for s in self._states if s.cooling_until > time.time()]
+                self._cond.wait(min([remaining] + [c for c in cooling if c > 0]))
+            state.in_flight += 1
+            state.uses += 1
+        try:
+            yield state.key
+        finally:
+            with self._cond:
+                state.in_flight -= 1
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def acquire_async(self, exclude: Iterable[str] = (), timeout: float = KEY_ACQUIRE_TIMEOUT,
+                            poll_interval: float = 0.05):
+        # Same checkout as acquire(), but polls instead of blocking the event loop
+        exclude = tuple(exclude)
+        deadline = time.time() + timeout
+        while True:
+            with self._cond:
+                if not self._usable(exclude):
+                    raise NoKeyAvailable(f"No {self.name} API key available")
+                state = self._pick(exclude)
+                if state is not None:
+                    state.in_flight += 1
+                    state.uses += 1
+                    break
+            if time.time() >= deadline:
+                raise NoKeyAvailable(f"All {self.name} API keys are busy or cooling down")
+            await asyncio.sleep(poll_interval)
+        try:
+            yield state.key
+        finally:
+            with self._cond:
+                state.in_flight -= 1
+                self._cond.notify_all()
+
+    def next_key(self) -> Optional[str]:
+        # One-off pick for long-lived clients that cannot check a key in and out
+        with self._cond:
+            state = self._pick(()) or (self._states[0] if self._states else None)
+            if state is not None:
+                state.uses += 1
+            return state.key if state else None
+
+    def cool_down(self, api_key: str, seconds: Optional[float] = None):
+        with self._cond:
+            for state in self._states:
+                if state.key == api_key:
+                    state.failures += 1
+                    state.cooling_until = time.time() + (self.cooldown if seconds is None else seconds)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._cond:
+            return {
+                fingerprint(state.key): {
+                    "uses": state.uses,
+                    "in_flight": state.in_flight,
+                    "failures": state.failures,
+                    "cooling_down_seconds": max(0, state.cooling_until - now),
+                }
+                for state in self._states
+            }
+
+
+_pools: Dict[str, KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str) -> KeyPool:
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = KeyPool(name, load_keys(name))
+        return pool
+
+
+def youtube_keys() -> KeyPool:
+    return get_pool("YOUTUBE")
+
+
+def gemini_keys() -> KeyPool:
+    return get_pool("GEMINI")
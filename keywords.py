@@ -0,0 +1,80 @@
+import re
+from collections import Counter
+from typing import Dict, List, Any, Iterable
+
+TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further get give had has have
+having he her here hers him his how i if in into is it its just latest let like make me more most my
+need new no nor not now of off on once only or other our out over own please same she should show so
+some such than that the their them then there these they this those through to too top trending under
+until up very video videos want was we were what when where which while who why will with would you
+your youtube shorts short content ideas idea best find create trend trends viral popular
+beginner beginners tips guide review reviews tutorial tutorials channel channels
+http https www com
+""".split())
+
+# Keyword counts cover single words and two-word phrases
+MAX_NGRAM = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+def extract_keyword(prompt: str) -> str:
+    # Mirrors the fetcher tasks' rule: a single keyword is used as-is, a longer
+    # prompt is reduced to its main single-word keyword
+    stripped = (prompt or "").strip()
+    if stripped and len(stripped.split()) == 1:
+        return stripped
+
+    tokens = tokenize(stripped)
+    candidates = [token for token in tokens if token not in STOPWORDS and not token.isdigit()]
+    if not candidates:
+        return tokens[0] if tokens else stripped
+
+    # Most repeated candidate wins; ties go to the longer, then earlier word
+    counts = Counter(candidates)
+    first_seen = {}
+    for index, token in enumerate(candidates):
+        first_seen.setdefault(token, index)
+    return max(counts, key=lambda token: (counts[token], len(token), -first_seen[token]))
+
+
+def _ngrams(tokens: List[str], max_n: int) -> Iterable[str]:
+    for n in range(1, max_n + 1):
+        for start in range(len(tokens) - n + 1):
+            gram = tokens[start:start + n]
+            # Phrases may not start or end on a stopword or a single letter; numbers are never keywords
+            if (gram[0] in STOPWORDS or gram[-1] in STOPWORDS or len(gram[0]) < 2 or len(gram[-1]) < 2
+                    or any(token.isdigit() for token in gram)):
+                continue
+            yield " ".join(gram)
+
+
+def keyword_counts(videos: Iterable[Dict[str, Any]], top_k: int = 10, max_n: int = MAX_NGRAM) -> List[List[Any]]:
+    # Number of distinct videos whose tags, title or description contain each
+    # keyword, as [keyword, count] pairs, most common first
+    counts: Counter = Counter()
+    seen = set()
+    for video in videos:
+        video_id = video.get("video_id")
+        if video_id in seen:
+            continue
+        seen.add(video_id)
+
+        terms = set()
+        for tag in video.get("tags") or []:
+            tag = " ".join(tokenize(tag))
+            if tag and tag not in STOPWORDS and not tag.isdigit():
+                terms.add(tag)
+        for text in (video.get("title"), video.get("description")):
+            terms.update(_ngrams(tokenize(text), max_n))
+        counts.update(terms)
+
+    # Ties go to the longer phrase, then alphabetically, so output is stable
+    ranked = sorted(counts.items(), key=lambda entry: (-entry[1], -len(entry[0].split()), entry[0]))
+    return [[keyword, count] for keyword, count in ranked[:top_k]]
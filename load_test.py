@@ -0,0 +1,226 @@
+# Load test for the async serving mode (asgi.py) against local stubs. The ASGI app
+# runs in this process under a single uvicorn worker, with the CrewAI stages
+# replaced by a stub that sleeps for a fixed "LLM" time. A stub YouTube Data API
+# (search/videos, fixed latency) and the client firing N concurrent fast-mode
+# POST /analyze-shorts run in child processes so they don't share its GIL.
+# Nothing touches the real APIs; databases go to a temporary directory.
+# Fast mode only: the default mode runs the real synchronous crew, one crew
+# thread per request, which a stub crew cannot stand in for.
+# Run with: python load_test.py [--requests 300] [--youtube-latency 0.2] [--llm-seconds 0.2]
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import multiprocessing
+
+STUB_PORT = 18765
+APP_PORT = 18766
+
+
+def configure_env(tmp_dir: str, args):
+    # Module-level settings are read at import time, so this runs before asgi is imported
+    os.environ.update({
+        "YOUTUBE_API_BASE": f"http://127.0.0.1:{STUB_PORT}",
+        "YOUTUBE_API_KEY": "stub-key",
+        "GEMINI_API_KEY": "stub-key",
+        "YOUTUBE_DAILY_QUOTA": "100000000",
+        "YOUTUBE_RATE_PER_SECOND": "100000",
+        "YOUTUBE_RATE_BURST": "100000",
+        "API_KEY_CONCURRENCY": "100000",
+        "YOUTUBE_POOL_SIZE": str(args.connections),
+        "YOUTUBE_CACHE_SIZE": "0",
+        "SEARCH_LOCAL_FIRST": "0",
+        "TRENDING_REFRESH_ENABLED": "0",
+        "CONTEXT_TOKEN_BUDGET": "0",
+        "CREW_POOL_SIZE": str(args.crews),
+        "DATA_DIR": tmp_dir,
+    })
+
+
+def stub_youtube_app(latency: float):
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    calls = {"search": 0, "videos": 0}
+
+    async def counts(request):
+        return JSONResponse(calls)
+
+    async def search(request):
+        calls["search"] += 1
+        await asyncio.sleep(latency)
+        query = request.query_params.get("q", "")
+        page = int(request.query_params.get("pageToken") or 0)
+        size = int(request.query_params.get("maxResults", 25))
+        items = [{"id": {"kind": "youtube#video", "videoId": f"{query}-{page}-{n}"}} for n in range(size)]
+        return JSONResponse({"etag": f"search-{query}-{page}", "nextPageToken": str(page + 1), "items": items})
+
+    async def videos(request):
+        calls["videos"] += 1
+        await asyncio.sleep(latency)
+        parts = request.query_params.get("part", "").split(",")
+        items = []
+        for n, video_id in enumerate(request.query_params.get("id", "").split(",")):
+            item = {"kind": "youtube#video", "etag": f"etag-{video_id}", "id": video_id}
+            if "snippet" in parts:
+                item["snippet"] = {
+                    "title": f"Stub video {video_id} cooking recipe",
+                    "description": "Quick cooking recipe with pasta and garlic",
+                    "tags": ["cooking", "pasta recipe", "garlic"],
+                    "channelId": f"channel-{n % 5}",
+                    "channelTitle": "Stub Channel",
+                    "categoryId": "26",
+                    "publishedAt": "2025-06-01T00:00:00Z",
+                }
+            if "contentDetails" in parts:
+                item["contentDetails"] = {"duration": "PT45S"}
+            if "statistics" in parts:
+                item["statistics"] = {"viewCount": str(1000 * (n + 1)), "likeCount": str(50 * (n + 1)),
+                                      "commentCount": str(n + 1)}
+            items.append(item)
+        return JSONResponse({"etag": f"videos-{len(items)}", "items": items})
+
+    return Starlette(routes=[Route("/search", search), Route("/videos", videos), Route("/calls", counts)])
+
+
+def run_stub(latency: float):
+    import uvicorn
+    uvicorn.run(stub_youtube_app(latency), host="127.0.0.1", port=STUB_PORT, log_level="warning")
+
+
+def stub_crew_class(llm_seconds: float):
+    # Stands in for YouTubeContentCrew: no agents or LLM, just the wait an LLM would cost
+    class StubCrew:
+        def analyze_prompt(self, user_prompt, content_type, region_code, on_stage=None, fast=False, prefetched=None):
+            time.sleep(llm_seconds)
+            videos = (prefetched or {}).get("search", {}).get("videos", [])
+            return {"marketing_strategy": {
+                "overall_goal": f"stub strategy for {user_prompt}",
+                "videos": {"top_matches": {"search": [{"video_id": video["video_id"]} for video in videos[:3]]}},
+            }}
+    return StubCrew
+
+
+def serve(app, port: int) -> threading.Thread:
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", workers=1))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return thread
+
+
+class InFlight:
+    # ASGI wrapper that records how many requests the app held at once
+    def __init__(self, app):
+        self.app = app
+        self.current = 0
+        self.peak = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.current -= 1
+
+
+def wait_for(url: str):
+    import httpx
+    while True:
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+
+
+async def fire(total: int, distinct: int):
+    import httpx
+
+    async def one(client, n):
+        start = time.perf_counter()
+        response = await client.post(f"http://127.0.0.1:{APP_PORT}/analyze-shorts", json={
+            "prompt": f"cooking{n % distinct}", "content_type": "shorts", "region_code": "IN", "fast": True
+        })
+        return response.status_code, response.json(), time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+    async with httpx.AsyncClient(limits=limits, timeout=600) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one(client, n) for n in range(total)])
+        return results, time.perf_counter() - start
+
+
+def run_client(total: int, distinct: int):
+    return asyncio.run(fire(total, distinct))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the async serving mode against local stubs")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--distinct", type=int, default=0, help="distinct prompts (default: all distinct)")
+    parser.add_argument("--youtube-latency", type=float, default=0.2)
+    parser.add_argument("--llm-seconds", type=float, default=0.2)
+    parser.add_argument("--crews", type=int, default=32)
+    parser.add_argument("--connections", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="load_test_")
+    configure_env(tmp_dir, args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import app as flask_module
+    flask_module.YouTubeContentCrew = stub_crew_class(args.llm_seconds)
+    import asgi
+
+    # Spawned children import only starlette/httpx, not this process's state
+    context = multiprocessing.get_context("spawn")
+    stub = context.Process(target=run_stub, args=(args.youtube_latency,), daemon=True)
+    stub.start()
+    wait_for(f"http://127.0.0.1:{STUB_PORT}/calls")
+    tracked = InFlight(asgi.app)
+    serve(tracked, APP_PORT)
+
+    with context.Pool(1) as client:
+        cpu_start = time.process_time()
+        results, elapsed = client.apply(run_client, (args.requests, args.distinct or args.requests))
+        app_cpu = time.process_time() - cpu_start
+    import httpx
+    calls = httpx.get(f"http://127.0.0.1:{STUB_PORT}/calls").json()
+    stub.terminate()
+    latencies = sorted(latency for _, _, latency in results)
+    ok = sum(1 for status, body, _ in results if status == 200 and body.get("status") == "success")
+    errors = [body.get("message") for status, body, _ in results if status != 200][:3]
+
+    print(json.dumps({
+        "process_id": os.getpid(),
+        "uvicorn_workers": 1,
+        "requests": args.requests,
+        "succeeded": ok,
+        "sample_errors": errors,
+        "peak_in_flight": tracked.peak,
+        "wall_seconds": round(elapsed, 2),
+        # CPU used by the app process (all threads); on few cores this, not waiting, bounds wall time
+        "app_cpu_seconds": round(app_cpu, 2),
+        "cpu_count": os.cpu_count(),
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_p95": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "latency_max": round(latencies[-1], 3),
+        "stub_calls": calls,
+        "crew_threads": asgi.CREW_THREADS,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from storage import SQLiteStore, Singleton, data_path
+
+METRICS_DB = data_path("METRICS_DB", "metrics_baseline.db")
+# Samples kept per region/category baseline; the oldest are dropped first
+BASELINE_MAX_SAMPLES = int(os.getenv("METRICS_BASELINE_MAX_SAMPLES", "5000"))
+# Region-less callers (the analysis tool) rank against the pooled baseline
+ALL_REGIONS = "ALL"
+
+METRIC_NAMES = [
+    "views_per_day", "likes_per_day", "comments_per_day",
+    "like_view_ratio", "comment_view_ratio", "engagement_rate",
+]
+RANKED_METRICS = ["view_count"] + METRIC_NAMES
+
+
+def compute_metrics(videos: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    # One vectorized pass over the whole result set; zero views or age give 0
+    views = np.array([video.get("view_count") or 0 for video in videos], dtype=np.float64)
+    likes = np.array([video.get("like_count") or 0 for video in videos], dtype=np.float64)
+    comments = np.array([video.get("comment_count") or 0 for video in videos], dtype=np.float64)
+    age = np.array([video.get("video_age_days") or 0 for video in videos], dtype=np.float64)
+
+    def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    return {
+        "view_count": views,
+        "like_count": likes,
+        "comment_count": comments,
+        "views_per_day": ratio(views, age),
+        "likes_per_day": ratio(likes, age),
+        "comments_per_day": ratio(comments, age),
+        "like_view_ratio": ratio(likes, views),
+        "comment_view_ratio": ratio(comments, views),
+        "engagement_rate": ratio(likes + comments, views),
+    }
+
+
+class MetricsBaseline(SQLiteStore):
+    def __init__(self, path: str = METRICS_DB, max_samples: int = BASELINE_MAX_SAMPLES):
+        super().__init__(path, timeout=10)
+        self.max_samples = max_samples
+        columns = ", ".join(f"{name} REAL NOT NULL" for name in RANKED_METRICS)
+        conn = self._conn()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS samples (
+                region TEXT NOT NULL,
+                category_id TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                {columns},
+                PRIMARY KEY (region, category_id, video_id)
+            )
+        """)
+        conn.commit()
+
+    def record(self, region: str, category_id: str, video_ids: List[str], metrics: Dict[str, np.ndarray]):
+        conn = self._conn()
+        now = time.time()
+        values = np.column_stack([metrics[name] for name in RANKED_METRICS]).tolist()
+        placeholders = ", ".join("?" * (len(RANKED_METRICS) + 4))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO samples (region, category_id, video_id, recorded_at, "
+            f"{', '.join(RANKED_METRICS)}) VALUES ({placeholders})",
+            [[region, category_id, video_id, now] + row for video_id, row in zip(video_ids, values) if video_id]
+        )
+        conn.execute(
+            "DELETE FROM samples WHERE region = ? AND category_id = ? AND video_id NOT IN ("
+            "SELECT video_id FROM samples WHERE region = ? AND category_id = ? "
+            "ORDER BY recorded_at DESC LIMIT ?)",
+            (region, category_id, region, category_id, self.max_samples)
+        )
+        conn.commit()
+
+    def percentile_ranks(self, region: str, category_id: str,
+                         metrics: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], int]:
+        # Share of baseline samples at or below each value, per metric
+        rows = self._conn().execute(
+            f"SELECT {', '.join(RANKED_METRICS)} FROM samples WHERE region = ? AND category_id = ?",
+            (region, category_id)
+        ).fetchall()
+        if not rows:
+            return {}, 0
+        baseline = np.sort(np.array(rows, dtype=np.float64), axis=0)
+        ranks = {
+            name: np.searchsorted(baseline[:, column], metrics[name], side="right") * 100.0 / len(rows)
+            for column, name in enumerate(RANKED_METRICS)
+        }
+        return ranks, len(rows)
+
+
+def rank_videos(videos: List[Dict[str, Any]], region: Optional[str] = None,
+                baseline: Optional[MetricsBaseline] = None) -> List[Dict[str, Any]]:
+    # Metrics and percentile ranks for each video, in input order. The batch is
+    # added to its region/category baseline before ranking, so the first run
+    # of a category ranks its videos against each other
+    if not videos:
+        return []
+    baseline = baseline or get_baseline()
+    metrics = compute_metrics(videos)
+    video_ids = [video.get("video_id") for video in videos]
+    categories = np.array([str(video.get("category_id") or "") for video in videos])
+    region = (region or ALL_REGIONS).upper()
+
+    results: List[Dict[str, Any]] = [{} for _ in videos]
+    for category_id in np.unique(categories).tolist():
+        positions = np.flatnonzero(categories == category_id)
+        group = {name: values[positions] for name, values in metrics.items()}
+        group_ids = [video_ids[position] for position in positions]
+        baseline.record(region, category_id, group_ids, group)
+        if region != ALL_REGIONS:
+            baseline.record(ALL_REGIONS, category_id, group_ids, group)
+        ranks, samples = baseline.percentile_ranks(region, category_id, group)
+
+        for offset, position in enumerate(positions):
+            result = {name: round(float(group[name][offset]), 6) for name in METRIC_NAMES}
+            result["percentile_ranks"] = {name: round(float(values[offset]), 1) for name, values in ranks.items()}
+            result["baseline"] = {"region": region, "category_id": category_id or None, "samples": samples}
+            results[position] = result
+    return results
+
+
+_baseline = Singleton(MetricsBaseline)
+
+
+def get_baseline() -> MetricsBaseline:
+    return _baseline.get()
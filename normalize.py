@@ -0,0 +1,114 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+
+# ISO-8601 durations as returned by the YouTube API, e.g. PT45S, PT1H2M3S, P1DT2H, P0D
+DURATION_RE = re.compile(
+    r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)(?:\.\d+)?S)?)?"
+)
+
+PUBLISHED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SHORTS_MAX_SECONDS = 60
+
+
+def _parse_duration_regex(duration: str) -> int:
+    match = DURATION_RE.fullmatch(duration or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = match.groups()
+    return (int(days or 0) * 86400 + int(hours or 0) * 3600
+            + int(minutes or 0) * 60 + int(seconds or 0))
+
+
+def parse_duration(duration: str) -> int:
+    # Fast path for PT[nM][nS], the shape of nearly every video; hours, days,
+    # fractions and anything malformed go through the regex
+    if not duration or duration[:2] != "PT" or "H" in duration:
+        return _parse_duration_regex(duration)
+    minutes, sep, seconds = duration[2:].partition("M")
+    if not sep:
+        minutes, seconds = "0", minutes
+    if seconds:
+        if seconds[-1] != "S":
+            return _parse_duration_regex(duration)
+        seconds = seconds[:-1]
+    else:
+        seconds = "0"
+    if minutes.isdigit() and seconds.isdigit():
+        return int(minutes) * 60 + int(seconds)
+    return _parse_duration_regex(duration)
+
+
+def parse_durations(durations: Iterable[str]) -> List[int]:
+    return [parse_duration(duration) for duration in durations]
+
+
+def video_age_days(published_at: str, now: Optional[datetime] = None) -> Optional[int]:
+    if not published_at:
+        return None
+    try:
+        published_date = datetime.strptime(published_at, PUBLISHED_AT_FORMAT)
+    except ValueError:
+        return None
+    return ((now or datetime.now()) - published_date).days
+
+
+def matches_content_type(seconds: int, content_type: str) -> bool:
+    if content_type == "shorts":
+        return seconds <= SHORTS_MAX_SECONDS
+    if content_type == "videos":
+        return seconds > SHORTS_MAX_SECONDS
+    return True
+
+
+def video_id_of(item: Dict[str, Any]) -> Optional[str]:
+    # search.list nests the ID as {"kind": ..., "videoId": ...}; videos.list uses a plain string
+    video_id = item.get("id")
+    if isinstance(video_id, dict):
+        return video_id.get("videoId")
+    return video_id
+
+
+def build_video_record(item: Dict[str, Any], seconds: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    snippet = item.get("snippet", {})
+    published_at = snippet.get("publishedAt", "")
+    tags = snippet.get("tags", [])
+    statistics = item.get("statistics", {})
+    return {
+        "video_id": video_id_of(item),
+        "title": snippet.get("title"),
+        "description": snippet.get("description"),
+        "channel_id": snippet.get("channelId"),
+        "channel_title": snippet.get("channelTitle"),
+        "published_at": published_at,
+        "video_age_days": video_age_days(published_at, now),
+        "duration_seconds": seconds,
+        "tags": tags,
+        "tag_count": len(tags),
+        "category_id": snippet.get("categoryId"),
+        "view_count": int(statistics.get("viewCount", 0)),
+        "like_count": int(statistics.get("likeCount", 0)),
+        "comment_count": int(statistics.get("commentCount", 0)),
+    }
+
+
+def collect_video_records(pages: Iterable[List[Dict[str, Any]]], content_type: str, limit: int = 10) -> List[Dict[str, Any]]:
+    # Pulls pages only until `limit` matching records are collected
+    records: List[Dict[str, Any]] = []
+    for items in pages:
+        records.extend(build_video_records(items, content_type, limit=limit - len(records)))
+        if len(records) >= limit:
+            break
+    return records
+
+
+def build_video_records(items: List[Dict[str, Any]], content_type: str, limit: int = 10) -> List[Dict[str, Any]]:
+    durations = parse_durations(item.get("contentDetails", {}).get("duration", "") for item in items)
+    now = datetime.now()
+    records = []
+    for item, seconds in zip(items, durations):
+        if matches_content_type(seconds, content_type):
+            records.append(build_video_record(item, seconds, now))
+            if len(records) >= limit:
+                break
+    return records
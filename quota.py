@@ -0,0 +1,191 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from keys import youtube_keys, fingerprint
+from storage import SQLiteStore, Singleton, data_path
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")  # YouTube quota resets at midnight Pacific
+except Exception:
+    QUOTA_TIMEZONE = timezone.utc
+
+# Units charged per call, from the YouTube Data API quota table
+ENDPOINT_COSTS = {
+    "search": 100,
+    "videos": 1,
+    "channels": 1,
+    "commentThreads": 1,
+}
+DEFAULT_COST = 1
+
+QUOTA_DB = data_path("QUOTA_DB", "quota.db")
+DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# Below this many remaining units only cheap (1-unit) calls are let through
+QUOTA_RESERVE = int(os.getenv("YOUTUBE_QUOTA_RESERVE", str(DAILY_QUOTA // 10)))
+RATE_PER_SECOND = float(os.getenv("YOUTUBE_RATE_PER_SECOND", "10"))
+RATE_BURST = float(os.getenv("YOUTUBE_RATE_BURST", "20"))
+RATE_MAX_WAIT = float(os.getenv("YOUTUBE_RATE_MAX_WAIT", "10"))
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def endpoint_cost(endpoint: str) -> int:
+    return ENDPOINT_COSTS.get(endpoint, DEFAULT_COST)
+
+
+def quota_day() -> str:
+    return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float) -> bool:
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class QuotaScheduler(SQLiteStore):
+    def __init__(self, path: str = QUOTA_DB, daily_quota: int = DAILY_QUOTA, reserve: int = QUOTA_RESERVE,
+                 rate: float = RATE_PER_SECOND, burst: float = RATE_BURST, max_wait: float = RATE_MAX_WAIT):
+        # Autocommit: charges run their own BEGIN IMMEDIATE transactions
+        super().__init__(path, autocommit=True)
+        self.daily_quota = daily_quota
+        self.reserve = reserve
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._stats = {"charged": 0, "rejected": 0, "throttled": 0}
+        conn = self._conn()
+        # Shared by every worker so the daily budget is enforced per key, not per process
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS quota_usage (
+                key_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                units INTEGER NOT NULL,
+                PRIMARY KEY (key_id, day)
+            )
+        """)
+        conn.commit()
+
+    def _bucket(self, kid: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(kid)
+            if bucket is None:
+                bucket = self._buckets[kid] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def used(self, api_key: Optional[str]) -> int:
+        row = self._conn().execute(
+            "SELECT units FROM quota_usage WHERE key_id = ? AND day = ?", (fingerprint(api_key), quota_day())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, api_key: Optional[str]) -> int:
+        return max(0, self.daily_quota - self.used(api_key))
+
+    def under_pressure(self, endpoint: str, api_key: Optional[str]) -> bool:
+        # Expensive calls are the first to go once the reserve is reached
+        cost = endpoint_cost(endpoint)
+        remaining = self.remaining(api_key)
+        if cost > 1:
+            return remaining - cost < self.reserve
+        return remaining < cost
+
+    def acquire(self, endpoint: str, api_key: Optional[str]):
+        cost = endpoint_cost(endpoint)
+        kid = fingerprint(api_key)
+
+        if self.under_pressure(endpoint, api_key):
+            self._count("rejected")
+            raise QuotaExceeded(
+                f"YouTube quota low for {endpoint} ({self.remaining(api_key)} units left today, "
+                f"{cost} needed, {self.reserve} reserved for cheaper calls)"
+            )
+
+        if not self._bucket(kid).acquire(self.max_wait):
+            self._count("throttled")
+            raise QuotaExceeded(f"YouTube rate limit: no capacity for {endpoint} within {self.max_wait}s")
+
+        # Charge atomically; a concurrent worker may have spent the last units
+        conn = self._conn()
+        day = quota_day()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT units FROM quota_usage WHERE key_id = ? AND day = ?", (kid, day)
+            ).fetchone()
+            used = row[0] if row else 0
+            if used + cost > self.daily_quota:
+                conn.execute("ROLLBACK")
+                self._count("rejected")
+                raise QuotaExceeded(f"YouTube daily quota exhausted ({used}/{self.daily_quota} units)")
+            conn.execute(
+                "INSERT INTO quota_usage (key_id, day, units) VALUES (?, ?, ?) "
+                "ON CONFLICT (key_id, day) DO UPDATE SET units = units + excluded.units",
+                (kid, day, cost)
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("charged")
+
+    def status(self) -> Dict[str, Any]:
+        day = quota_day()
+        rows = self._conn().execute(
+            "SELECT key_id, units FROM quota_usage WHERE day = ?", (day,)
+        ).fetchall()
+        # Configured keys not yet charged today still have their full budget
+        usage = {fingerprint(api_key): 0 for api_key in youtube_keys().keys}
+        usage.update(rows)
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            "day": day,
+            "daily_quota": self.daily_quota,
+            "reserve": self.reserve,
+            "rate_per_second": self.rate,
+            "endpoint_costs": ENDPOINT_COSTS,
+            "keys": {
+                kid: {"used": units, "remaining": max(0, self.daily_quota - units)}
+                for kid, units in usage.items()
+            },
+            "stats": stats,
+        }
+
+
+_scheduler = Singleton(QuotaScheduler)
+
+
+def get_scheduler() -> QuotaScheduler:
+    return _scheduler.get()
@@ -0,0 +1,156 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Iterable
+
+from keywords import tokenize
+from normalize import matches_content_type, video_age_days
+from storage import SQLiteStore, Singleton, data_path
+
+SEARCH_INDEX_DB = data_path("SEARCH_INDEX_DB", "search_index.db")
+# Documents indexed longer ago than this are too stale to answer a search
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "21600"))
+# Title words count more than tags, tags more than description words
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 1}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class SearchIndex(SQLiteStore):
+    def __init__(self, path: str = SEARCH_INDEX_DB):
+        super().__init__(path, timeout=10)
+        self._stats = {"indexed": 0, "searches": 0, "hits": 0}
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                video_id TEXT PRIMARY KEY,
+                region TEXT,
+                published_at TEXT,
+                duration_seconds INTEGER,
+                length INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, video_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_video ON postings (video_id);
+        """)
+        conn.commit()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    @staticmethod
+    def _term_frequencies(record: Dict[str, Any]) -> Counter:
+        counts: Counter = Counter()
+        fields = {
+            "title": record.get("title") or "",
+            "tags": " ".join(record.get("tags") or []),
+            "description": record.get("description") or "",
+        }
+        for field, text in fields.items():
+            for token in tokenize(text):
+                counts[token] += FIELD_WEIGHTS[field]
+        return counts
+
+    def add(self, records: Iterable[Dict[str, Any]], region: Optional[str] = None) -> int:
+        # Re-indexing a video replaces its postings; a known region is kept
+        # when the new record comes without one
+        conn = self._conn()
+        now = time.time()
+        added = 0
+        for record in records:
+            video_id = record.get("video_id")
+            if not video_id:
+                continue
+            counts = self._term_frequencies(record)
+            conn.execute("DELETE FROM postings WHERE video_id = ?", (video_id,))
+            conn.execute(
+                "INSERT INTO documents (video_id, region, published_at, duration_seconds, length, indexed_at, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (video_id) DO UPDATE SET region = COALESCE(excluded.region, region), "
+                "published_at = excluded.published_at, duration_seconds = excluded.duration_seconds, "
+                "length = excluded.length, indexed_at = excluded.indexed_at, record = excluded.record",
+                (video_id, region.upper() if region else None, record.get("published_at") or "",
+                 record.get("duration_seconds") or 0, sum(counts.values()), now, json.dumps(record))
+            )
+            conn.executemany(
+                "INSERT INTO postings (term, video_id, tf) VALUES (?, ?, ?)",
+                [(term, video_id, tf) for term, tf in counts.items()]
+            )
+            added += 1
+        conn.commit()
+        self._count("indexed", added)
+        return added
+
+    def search(self, query: str, region: Optional[str] = None, content_type: str = "both",
+               published_after: str = "", limit: int = 10,
+               max_age: float = SEARCH_INDEX_MAX_AGE) -> List[Dict[str, Any]]:
+        self._count("searches")
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        conn = self._conn()
+        total, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM documents").fetchone()
+        if not total:
+            return []
+
+        # Documents that are fresh, in the region and in the date range compete
+        sql = ("SELECT p.video_id, p.tf, d.length, d.duration_seconds FROM postings p "
+               "JOIN documents d ON d.video_id = p.video_id "
+               "WHERE p.term = ? AND d.indexed_at >= ? AND d.published_at >= ?")
+        base_args: List[Any] = [time.time() - max_age, published_after]
+        if region:
+            sql += " AND (d.region = ? OR d.region IS NULL)"
+            base_args.append(region.upper())
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            df = conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+            if not df:
+                continue
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for video_id, tf, length, seconds in conn.execute(sql, [term] + base_args):
+                if not matches_content_type(seconds, content_type):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+                scores[video_id] = scores.get(video_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda entry: entry[1], reverse=True)[:limit]
+        if not ranked:
+            return []
+        placeholders = ",".join("?" * len(ranked))
+        stored = dict(conn.execute(
+            f"SELECT video_id, record FROM documents WHERE video_id IN ({placeholders})",
+            [video_id for video_id, _ in ranked]
+        ).fetchall())
+
+        results = []
+        for video_id, score in ranked:
+            record = json.loads(stored[video_id])
+            record["video_age_days"] = video_age_days(record.get("published_at", ""))
+            record["relevance_score"] = round(score, 4)
+            results.append(record)
+        self._count("hits", len(results))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        documents = self._conn().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        with self._lock:
+            return {"documents": documents, **self._stats}
+
+
+_index = Singleton(SearchIndex)
+
+
+def get_search_index() -> SearchIndex:
+    return _index.get()
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Any, Callable, Optional
+
+from storage import SQLiteStore, Singleton, data_path
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; coalescing stays per process
+    fcntl = None
+
+SINGLEFLIGHT_DIR = data_path("SINGLEFLIGHT_DIR", "singleflight")
+# How long a finished result stays available to requests that were waiting on it
+SINGLEFLIGHT_RESULT_TTL = float(os.getenv("SINGLEFLIGHT_RESULT_TTL", "300"))
+
+
+def request_key(prompt: str, content_type: str, region_code: str, mode: str = "crew") -> str:
+    normalized = json.dumps([
+        " ".join(prompt.lower().split()),
+        (content_type or "").strip().lower(),
+        (region_code or "").strip().upper(),
+        mode,
+    ])
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        # Progress events so far, replayed to callers that join late
+        self.events: List[tuple] = []
+        self.listeners: List[Callable[..., None]] = []
+        self.lock = threading.RLock()
+
+
+class SingleFlight(SQLiteStore):
+    def __init__(self, directory: str = SINGLEFLIGHT_DIR, cross_process: bool = True):
+        self.directory = directory if cross_process and fcntl is not None else None
+        # Results are shared through SQLite only across processes
+        super().__init__(os.path.join(self.directory, "results.db") if self.directory else ":memory:")
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "deduplicated_local": 0, "deduplicated_shared": 0}
+        if self.directory:
+            conn = self._conn()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    finished_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key: str, fn: Callable[[], Any], listener: Optional[Callable[..., None]] = None,
+           on_join: Optional[Callable[[], None]] = None) -> Any:
+        # Same key already running in this process: wait for it and share the
+        # result. listener gets every event the run publish()es, whichever
+        # caller started it; on_join is called if this caller joined another run
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self._stats["deduplicated_local"] += 1
+
+        if not leader and on_join:
+            on_join()
+        if listener:
+            with call.lock:
+                call.listeners.append(listener)
+                for event in call.events:
+                    self._notify(listener, event)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn, on_join) if self.directory else self._execute(fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def publish(self, key: str, *event: Any):
+        # Called from inside a running fn: passes a progress event to every caller waiting on it
+        with self._lock:
+            call = self._calls.get(key)
+        if call is None:
+            return
+        with call.lock:
+            call.events.append(event)
+            for listener in list(call.listeners):
+                self._notify(listener, event)
+
+    def _notify(self, listener: Callable[..., None], event: tuple):
+        # One caller's failing listener must not break the run the others wait on
+        try:
+            listener(*event)
+        except Exception as e:
+            print(f"Error in single-flight listener: {str(e)}")
+
+    def _execute(self, fn: Callable[[], Any]) -> Any:
+        self._count("executions")
+        return fn()
+
+    def _do_shared(self, key: str, fn: Callable[[], Any], on_join: Optional[Callable[[], None]] = None) -> Any:
+        # One process at a time holds the per-key file lock; a process that had
+        # to wait for it picks up the result the holder just stored. Its events
+        # stay in that process, so waiting callers only learn that they joined
+        requested_at = time.time()
+        with open(os.path.join(self.directory, f"{key}.lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if on_join:
+                    on_join()
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                shared = self._load(key, requested_at)
+                if shared is not None:
+                    self._count("deduplicated_shared")
+                    return shared
+                result = self._execute(fn)
+                self._store(key, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, key: str, requested_at: float) -> Optional[Any]:
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM results WHERE key = ? AND finished_at >= ?", (key, requested_at)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _store(self, key: str, result: Any):
+        try:
+            conn = self._conn()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, finished_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result, default=str), now)
+            )
+            conn.execute("DELETE FROM results WHERE finished_at < ?", (now - SINGLEFLIGHT_RESULT_TTL,))
+            conn.commit()
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        stats["deduplicated"] = stats["deduplicated_local"] + stats["deduplicated_shared"]
+        stats["cross_process"] = self.directory is not None
+        return stats
+
+
+_single_flight = Singleton(SingleFlight)
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight.get()
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+# Every SQLite store lives here unless its own *_DB variable names another path
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+T = TypeVar("T")
+
+
+def data_path(env_name: str, filename: str) -> str:
+    return os.getenv(env_name) or os.path.join(DATA_DIR, filename)
+
+
+class SQLiteStore:
+    # Base for the SQLite-backed stores: one connection per thread, and WAL so
+    # gunicorn workers can read while one of them writes
+    def __init__(self, path: str, timeout: float = 5, autocommit: bool = False):
+        self.path = path
+        self.timeout = timeout
+        # Autocommit connections manage their own BEGIN/COMMIT
+        self.isolation_level = None if autocommit else ""
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                   isolation_level=self.isolation_level)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class Singleton(Generic[T]):
+    # Process-wide instance, built on first use behind a double-checked lock
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
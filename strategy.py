@@ -0,0 +1,265 @@
+import re
+import json
+import typing
+from typing import Dict, List, Any, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, BeforeValidator, ValidationError
+
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+COUNT_RE = re.compile(r"^([\d.]+)\s*([kmb]?)$", re.IGNORECASE)
+COUNT_SUFFIXES = {"": 1, "k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+# Truncated output is closed at the latest of this many cut points that parses
+MAX_REPAIR_ATTEMPTS = 200
+# Rounds of dropping invalid fields before the output is rejected
+MAX_VALIDATION_PASSES = 5
+
+
+class StrategyParseError(ValueError):
+    # The strategist's output is not JSON even after local repair
+    def __init__(self, message: str, raw_output: str):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+def _to_int(value: Any) -> Any:
+    # The model writes counts like "1,234", "1.2M" or 1234.0
+    if value is None or value == "":
+        return 0
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        match = COUNT_RE.match(value.replace(",", "").strip())
+        if match:
+            return int(float(match.group(1)) * COUNT_SUFFIXES[match.group(2).lower()])
+    return value
+
+
+def _to_float(value: Any) -> Any:
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, str):
+        return value.replace(",", "").rstrip("%").strip()
+    return value
+
+
+def _to_text(value: Any) -> Any:
+    # Lists of points are joined rather than rejected
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    return value
+
+
+Count = typing.Annotated[int, BeforeValidator(_to_int)]
+Rate = typing.Annotated[float, BeforeValidator(_to_float)]
+Text = typing.Annotated[str, BeforeValidator(_to_text)]
+
+
+class StrategyModel(BaseModel):
+    # Extra fields the model adds are kept rather than failing validation
+    model_config = ConfigDict(extra="allow")
+
+
+class VideoStatistics(StrategyModel):
+    views: Count = 0
+    likes: Count = 0
+    comments: Count = 0
+
+
+class AnalyzedVideoStatistics(VideoStatistics):
+    subscribers: Count = 0
+    views_per_day: Count = 0
+    engagement_rate: Rate = 0.0
+
+
+class VideoSummary(StrategyModel):
+    video_id: str = ""
+    title: Text = ""
+    statistics: VideoStatistics = Field(default_factory=VideoStatistics)
+    video_url: str = ""
+
+
+class AnalyzedVideo(StrategyModel):
+    video_id: str = ""
+    title: Text = ""
+    description: Text = ""
+    statistics: AnalyzedVideoStatistics = Field(default_factory=AnalyzedVideoStatistics)
+    analysis: Text = ""
+    current_trends: Text = ""
+    future_trends: Text = ""
+    video_url: str = ""
+
+
+class TopMatches(StrategyModel):
+    trending: List[VideoSummary] = Field(default_factory=list)
+    search: List[VideoSummary] = Field(default_factory=list)
+
+
+class VideoOrganization(StrategyModel):
+    analyzed_videos: List[AnalyzedVideo] = Field(default_factory=list)
+    top_matches: TopMatches = Field(default_factory=TopMatches)
+    similar_content: List[VideoSummary] = Field(default_factory=list)
+    trending_content: List[VideoSummary] = Field(default_factory=list)
+
+
+class ContentRecommendations(StrategyModel):
+    content_types: List[Text] = Field(default_factory=list)
+    visual_style: Text = ""
+    audio_music: Text = ""
+    storytelling_approach: Text = ""
+    editing_style_and_pacing: Text = ""
+
+
+class MarketingTactics(StrategyModel):
+    # Filled in from the locally computed keyword counts
+    recommended_tags_and_keywords: List[Any] = Field(default_factory=list)
+    title_and_description_optimization: Text = ""
+    thumbnail_design_recommendations: Text = ""
+    best_posting_times_and_frequency: Text = ""
+    audience_engagement_strategies: Text = ""
+
+
+class SuccessMetrics(StrategyModel):
+    how_to_measure_effectiveness: Text = ""
+    expected_engagement_patterns: Text = ""
+    growth_opportunities: Text = ""
+
+
+class TrendAnalysis(StrategyModel):
+    current_trends: Text = ""
+    future_predictions: Text = ""
+
+
+class MarketingStrategy(StrategyModel):
+    target_audience: Text = ""
+    overall_goal: Text = ""
+    content_recommendations: ContentRecommendations = Field(default_factory=ContentRecommendations)
+    marketing_tactics: MarketingTactics = Field(default_factory=MarketingTactics)
+    success_metrics: SuccessMetrics = Field(default_factory=SuccessMetrics)
+    trend_analysis: TrendAnalysis = Field(default_factory=TrendAnalysis)
+    videos: VideoOrganization = Field(default_factory=VideoOrganization)
+
+
+class StrategyReport(StrategyModel):
+    marketing_strategy: MarketingStrategy = Field(default_factory=MarketingStrategy)
+
+
+def _outline_type(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Annotated:
+        return _outline_type(args[0])
+    if origin in (list, List):
+        return [_outline_type(args[0])] if args and args[0] is not Any else []
+    if origin is typing.Union:
+        return _outline_type(next(arg for arg in args if arg is not type(None)))
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return outline(annotation)
+    return getattr(annotation, "__name__", "str")
+
+
+def outline(model: typing.Type[BaseModel] = StrategyReport) -> Dict[str, Any]:
+    # Field names with type names as values; far shorter than a filled-in example
+    return {name: _outline_type(field.annotation) for name, field in model.model_fields.items()}
+
+
+def strip_fences(text: str) -> str:
+    return FENCE_RE.sub("", text or "")
+
+
+def repair_json(text: str) -> str:
+    # Drops trailing commas and prose around the object, and closes output cut
+    # off mid-way at the last point where it still parses
+    text = strip_fences(text)
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object in output")
+
+    out: List[str] = []
+    stack: List[str] = []
+    # (length of out, closers needed) wherever the output could be cut cleanly
+    cut_points: List[Tuple[int, str]] = []
+    in_string = False
+    escape = False
+    for char in text[start:]:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            out.append(char)
+            stack.append("}" if char == "{" else "]")
+            cut_points.append((len(out), "".join(reversed(stack))))
+        elif char in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            out.append(char)
+            if stack:
+                stack.pop()
+            if not stack:
+                return "".join(out)
+            cut_points.append((len(out), "".join(reversed(stack))))
+        elif char == ",":
+            cut_points.append((len(out), "".join(reversed(stack))))
+            out.append(char)
+        else:
+            out.append(char)
+
+    # Truncated: try closing as-is, then at earlier cut points
+    tail = "".join(out)
+    if in_string:
+        tail = (tail[:-1] if escape else tail) + '"'
+    candidates = [tail.rstrip().rstrip(",") + "".join(reversed(stack))]
+    candidates += ["".join(out[:length]) + closers for length, closers in reversed(cut_points[-MAX_REPAIR_ATTEMPTS:])]
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    raise ValueError("could not repair truncated JSON output")
+
+
+def _drop_invalid(data: Any, loc: Tuple[Any, ...]):
+    # Deletes the value at loc so the field falls back to its default; an
+    # invalid list item is removed from its list
+    for depth in range(len(loc), 0, -1):
+        try:
+            parent = data
+            for part in loc[:depth - 1]:
+                parent = parent[part]
+            del parent[loc[depth - 1]]
+            return
+        except (KeyError, IndexError, TypeError):
+            continue
+
+
+def parse_strategy(text: str) -> Dict[str, Any]:
+    # Plain parse first; repair only when that fails. Never calls the LLM again
+    try:
+        data = json.loads(strip_fences(text))
+    except ValueError:
+        data = json.loads(repair_json(text))
+    if not isinstance(data, dict):
+        raise ValueError("strategy output is not a JSON object")
+    if "marketing_strategy" not in data:
+        data = {"marketing_strategy": data}
+
+    # One bad field costs that field, not the whole report's validation
+    for _ in range(MAX_VALIDATION_PASSES):
+        try:
+            return StrategyReport.model_validate(data).model_dump()
+        except ValidationError as e:
+            errors = e.errors()
+            print(f"Strategy output failed validation: dropping {len(errors)} invalid fields")
+            # Deepest and highest-index locations first, so list positions stay valid
+            for error in sorted(errors, key=lambda error: error["loc"], reverse=True):
+                _drop_invalid(data, error["loc"])
+    raise ValueError("strategy output does not match the schema")
@@ -0,0 +1,20 @@
+import pytest
+
+import app
+
+
+def test_acquire_raises_when_no_crew_frees_up():
+    pool = app.CrewPool(size=0, acquire_timeout=0.01)
+    with pytest.raises(app.CrewPoolExhausted, match="No crew available within 0.01s"):
+        with pool.acquire():
+            pass
+
+
+def test_exhausted_crew_pool_is_503(monkeypatch):
+    def run_analysis(*args, **kwargs):
+        raise app.CrewPoolExhausted("No crew available within 600s")
+
+    monkeypatch.setattr(app, "run_analysis", run_analysis)
+    response = app.app.test_client().post("/analyze-shorts", json={"prompt": "cooking"})
+    assert response.status_code == 503
+    assert response.get_json()["message"] == "No crew available within 600s"
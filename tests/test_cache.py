@@ -0,0 +1,39 @@
+import time
+
+import youtube_client
+from cache import ResponseCache, cache_key
+
+
+def accessed_at(cache, endpoint, params):
+    row = cache.disk._conn().execute(
+        "SELECT accessed_at FROM responses WHERE key = ?", (cache_key(endpoint, params),)
+    ).fetchone()
+    return row[0]
+
+
+def test_only_fresh_disk_hits_touch_accessed_at(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    cache.put("search", {"q": "a"}, {"items": []})
+    stored = accessed_at(cache, "search", {"q": "a"})
+
+    # A new worker reads through to disk
+    other = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    time.sleep(0.01)
+    other.peek("search", {"q": "a"})
+    assert accessed_at(other, "search", {"q": "a"}) == stored
+
+    other = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    assert other.get("search", {"q": "a"}) == {"items": []}
+    assert accessed_at(other, "search", {"q": "a"}) > stored
+
+
+def test_stale_response_under_quota_pressure_counts_once(monkeypatch):
+    cache = ResponseCache()
+    cache.put("search", {"q": "a"}, {"items": []}, ttl=-1)
+    monkeypatch.setattr(youtube_client, "get_cache", lambda: cache)
+    monkeypatch.setattr(youtube_client, "quota_pressure", lambda endpoint: True)
+
+    assert youtube_client.cached_response("search", {"q": "a"}) == ({"items": []}, None)
+    stats = cache.stats()
+    assert stats["stale_hits"] == 1
+    assert stats["misses"] == 0
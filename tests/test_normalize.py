@@ -0,0 +1,27 @@
+import pytest
+
+from normalize import parse_duration, parse_durations
+
+
+@pytest.mark.parametrize("duration, seconds", [
+    ("PT45S", 45),
+    ("PT3M", 180),
+    ("PT1M30S", 90),
+    ("PT1H2M3S", 3723),
+    ("PT2H", 7200),
+    ("P1DT2H", 93600),
+    ("P1D", 86400),
+    ("PT1M30.5S", 90),
+    ("PT0S", 0),
+])
+def test_parse_duration(duration, seconds):
+    assert parse_duration(duration) == seconds
+
+
+@pytest.mark.parametrize("duration", ["", None, "PT", "1M30S", "PTxS", "PT1M30", "PT-5S", "P1W", "garbage"])
+def test_malformed_duration_is_zero(duration):
+    assert parse_duration(duration) == 0
+
+
+def test_parse_durations_keeps_order():
+    assert parse_durations(["PT1H", "PT5S", "bad"]) == [3600, 5, 0]
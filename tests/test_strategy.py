@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from strategy import repair_json, parse_strategy
+
+
+def test_trailing_commas_are_dropped():
+    text = '{"a": [1, 2, 3,], "b": {"c": "d",},}'
+    assert json.loads(repair_json(text)) == {"a": [1, 2, 3], "b": {"c": "d"}}
+
+
+def test_commas_inside_strings_are_kept():
+    text = '{"a": "x,}", "b": ",]",}'
+    assert json.loads(repair_json(text)) == {"a": "x,}", "b": ",]"}
+
+
+def test_prose_and_fences_around_the_object():
+    text = 'Here is the strategy:\n```json\n{"a": {"b": 1}}\n```\nLet me know if you need more.'
+    assert json.loads(repair_json(text)) == {"a": {"b": 1}}
+
+
+def test_prose_with_braces_after_the_object():
+    text = 'Result: {"a": 1} and {"b": 2} was an earlier draft'
+    assert json.loads(repair_json(text)) == {"a": 1}
+
+
+def test_truncated_between_values():
+    text = '{"a": [1, 2, {"b": "c"}, '
+    assert json.loads(repair_json(text)) == {"a": [1, 2, {"b": "c"}]}
+
+
+def test_truncated_mid_string():
+    text = '{"a": "complete", "b": "cut off he'
+    assert json.loads(repair_json(text)) == {"a": "complete", "b": "cut off he"}
+
+
+def test_truncated_mid_escape():
+    text = '{"a": "line one\\'
+    assert json.loads(repair_json(text)) == {"a": "line one"}
+
+
+def test_truncated_after_escaped_quote():
+    text = '{"a": "say \\"hi\\" to'
+    assert json.loads(repair_json(text)) == {"a": 'say "hi" to'}
+
+
+def test_truncated_after_key():
+    text = '{"a": 1, "b": {"c": 2}, "d":'
+    assert json.loads(repair_json(text)) == {"a": 1, "b": {"c": 2}}
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError):
+        repair_json("The model declined to answer.")
+
+
+def test_parse_strategy_repairs_and_wraps():
+    report = parse_strategy('{"overall_goal": "grow", "target_audience": "cooks",')
+    assert report["marketing_strategy"]["overall_goal"] == "grow"
+    assert report["marketing_strategy"]["target_audience"] == "cooks"
+
+
+def test_parse_strategy_defaults_invalid_fields():
+    report = parse_strategy(json.dumps({"marketing_strategy": {
+        "overall_goal": "grow",
+        "marketing_tactics": "not an object",
+        "videos": {"analyzed_videos": [
+            {"video_id": "a", "statistics": {"views": "lots", "likes": "1.2k"}},
+            5,
+        ]},
+    }}))
+    strategy = report["marketing_strategy"]
+    assert strategy["overall_goal"] == "grow"
+    assert strategy["marketing_tactics"]["recommended_tags_and_keywords"] == []
+    assert [video["video_id"] for video in strategy["videos"]["analyzed_videos"]] == ["a"]
+    assert strategy["videos"]["analyzed_videos"][0]["statistics"]["views"] == 0
+    assert strategy["videos"]["analyzed_videos"][0]["statistics"]["likes"] == 1200
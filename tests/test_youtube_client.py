@@ -0,0 +1,79 @@
+import pytest
+
+import youtube_client
+from cache import ResponseCache
+
+
+class FakeClient:
+    def __init__(self, videos):
+        self.videos = videos
+        self.requests = []
+
+    def get(self, endpoint, params, etag=None):
+        parts = params["part"].split(",")
+        self.requests.append((endpoint, params["part"], params["id"]))
+        items = []
+        for video_id in params["id"].split(","):
+            if video_id in self.videos:
+                video = self.videos[video_id]
+                items.append(dict({part: video[part] for part in parts}, id=video_id))
+        return {"items": items}
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    cache = ResponseCache()
+    client = FakeClient({
+        "a": {"snippet": {"title": "A"}, "statistics": {"viewCount": "10"}},
+        "b": {"snippet": {"title": "B"}, "statistics": {"viewCount": "20"}},
+    })
+    monkeypatch.setattr(youtube_client, "get_cache", lambda: cache)
+    monkeypatch.setattr(youtube_client, "get_client", lambda: client)
+    monkeypatch.setattr(youtube_client, "quota_pressure", lambda endpoint: False)
+    return client, cache
+
+
+def test_known_videos_only_refresh_statistics(fake_api):
+    client, _ = fake_api
+    youtube_client.fetch_videos(["a", "b"], "snippet,statistics")
+    client.videos["a"]["statistics"] = {"viewCount": "15"}
+
+    items = youtube_client.fetch_videos(["b", "a"], "snippet,statistics")
+
+    assert [item["id"] for item in items] == ["b", "a"]
+    assert items[1]["snippet"] == {"title": "A"}
+    assert items[1]["statistics"] == {"viewCount": "15"}
+    assert client.requests[-1] == ("videos", "statistics", "b,a")
+
+
+def test_video_missing_from_statistics_refresh_is_dropped(fake_api):
+    client, cache = fake_api
+    youtube_client.fetch_videos(["a", "b"], "snippet,statistics")
+    del client.videos["b"]
+
+    items = youtube_client.fetch_videos(["a", "b"], "snippet,statistics")
+
+    assert [item["id"] for item in items] == ["a"]
+    assert cache.peek("videos", youtube_client._static_key("b")) is None
+    assert cache.peek("videos", youtube_client._static_key("a")) is not None
+
+
+def test_default_search_budget_covers_every_page():
+    pages = youtube_client.SearchPages({"q": "cooking"})
+    video_ids = [{"id": {"videoId": str(i)}} for i in range(youtube_client.SEARCH_PAGE_SIZE)]
+    while pages.next_search() is not None:
+        for _ in pages.video_batches({"items": video_ids, "nextPageToken": "next"}):
+            assert pages.charge_videos()
+
+    assert pages.pages == youtube_client.SEARCH_MAX_PAGES
+
+
+def test_channel_lookup_error_raises(monkeypatch):
+    class ErrorClient:
+        def get(self, endpoint, params, etag=None):
+            return {"error": {"code": 403, "message": "quotaExceeded"}}
+
+    monkeypatch.setattr(youtube_client, "get_cache", lambda: ResponseCache())
+    monkeypatch.setattr(youtube_client, "get_client", lambda: ErrorClient())
+    with pytest.raises(youtube_client.YouTubeAPIError, match="quotaExceeded"):
+        youtube_client.fetch_channels(["UC1"])
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Any, Optional
+
+from keywords import tokenize
+from youtube_client import youtube_get
+from storage import SQLiteStore, Singleton, data_path
+
+TRENDING_DB = data_path("TRENDING_DB", "trending.db")
+TRENDING_REGIONS = [r.strip().upper() for r in os.getenv("TRENDING_REGIONS", "IN,US").split(",") if r.strip()]
+# Empty entry = the overall chart; the rest are videoCategoryId values
+TRENDING_CATEGORIES = [c.strip() for c in os.getenv("TRENDING_CATEGORIES", ",10,17,20,22,24,28").split(",")]
+TRENDING_REFRESH_INTERVAL = float(os.getenv("TRENDING_REFRESH_INTERVAL", "3600"))
+TRENDING_MAX_STALENESS = float(os.getenv("TRENDING_MAX_STALENESS", "7200"))
+TRENDING_PARTS = "snippet,contentDetails,statistics"
+# Older snapshots are dropped; recent history is kept for view velocity
+TRENDING_RETENTION = float(os.getenv("TRENDING_RETENTION_DAYS", "30")) * 86400
+TRENDING_REFRESH_ENABLED = os.getenv("TRENDING_REFRESH_ENABLED", "1") == "1"
+
+
+class TrendingIndex(SQLiteStore):
+    def __init__(self, path: str = TRENDING_DB):
+        super().__init__(path, timeout=10)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                region TEXT NOT NULL,
+                category_id TEXT NOT NULL,
+                taken_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_lookup ON snapshots (region, category_id, taken_at);
+            CREATE TABLE IF NOT EXISTS snapshot_videos (
+                snapshot_id INTEGER NOT NULL,
+                video_id TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                view_count INTEGER NOT NULL,
+                search_text TEXT NOT NULL,
+                item TEXT NOT NULL,
+                PRIMARY KEY (snapshot_id, video_id)
+            );
+            CREATE INDEX IF NOT EXISTS snapshot_videos_video ON snapshot_videos (video_id, snapshot_id);
+        """)
+        conn.commit()
+
+    def last_taken_at(self, region: str, category_id: str) -> Optional[float]:
+        row = self._conn().execute(
+            "SELECT MAX(taken_at) FROM snapshots WHERE region = ? AND category_id = ?", (region, category_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def store(self, region: str, category_id: str, items: List[Dict[str, Any]], taken_at: Optional[float] = None) -> int:
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT INTO snapshots (region, category_id, taken_at) VALUES (?, ?, ?)",
+            (region, category_id, taken_at or time.time())
+        )
+        snapshot_id = cursor.lastrowid
+        rows = []
+        for rank, item in enumerate(items):
+            snippet = item.get("snippet", {})
+            search_text = " ".join(tokenize(" ".join([
+                snippet.get("title", ""), " ".join(snippet.get("tags", [])), snippet.get("description", "")
+            ])))
+            rows.append((
+                snapshot_id, item.get("id"), rank,
+                int(item.get("statistics", {}).get("viewCount", 0)),
+                f" {search_text} ", json.dumps(item)
+            ))
+        conn.executemany(
+            "INSERT OR REPLACE INTO snapshot_videos (snapshot_id, video_id, rank, view_count, search_text, item) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        return snapshot_id
+
+    def purge(self, retention: float = TRENDING_RETENTION):
+        conn = self._conn()
+        cutoff = time.time() - retention
+        conn.execute(
+            "DELETE FROM snapshot_videos WHERE snapshot_id IN (SELECT id FROM snapshots WHERE taken_at < ?)",
+            (cutoff,)
+        )
+        conn.execute("DELETE FROM snapshots WHERE taken_at < ?", (cutoff,))
+        conn.commit()
+
+    def lookup(self, region: str, query: str = "", max_age: float = TRENDING_MAX_STALENESS) -> Optional[Dict[str, Any]]:
+        # Freshest snapshot per category for the region, if any is within max_age
+        conn = self._conn()
+        snapshots = conn.execute(
+            "SELECT id, category_id, MAX(taken_at) FROM snapshots WHERE region = ? AND taken_at >= ? "
+            "GROUP BY category_id",
+            (region.upper(), time.time() - max_age)
+        ).fetchall()
+        if not snapshots:
+            return None
+
+        snapshot_ids = [row[0] for row in snapshots]
+        placeholders = ",".join("?" * len(snapshot_ids))
+        sql = (f"SELECT video_id, view_count, item, snapshot_id FROM snapshot_videos "
+               f"WHERE snapshot_id IN ({placeholders})")
+        args: List[Any] = list(snapshot_ids)
+        for token in tokenize(query):
+            sql += " AND search_text LIKE ?"
+            args.append(f"% {token} %")
+        sql += " ORDER BY view_count DESC"
+
+        items = []
+        seen = set()
+        for video_id, view_count, item, snapshot_id in conn.execute(sql, args):
+            if video_id in seen:
+                continue
+            seen.add(video_id)
+            item = json.loads(item)
+            item["view_velocity_per_hour"] = self._velocity(video_id, snapshot_id, view_count)
+            items.append(item)
+        return {"taken_at": min(row[2] for row in snapshots), "items": items}
+
+    def _velocity(self, video_id: str, snapshot_id: int, view_count: int) -> Optional[float]:
+        # Views gained per hour since the previous snapshot that saw this video
+        row = self._conn().execute("""
+            SELECT cur.taken_at, prev.taken_at, sv.view_count
+            FROM snapshots cur
+            JOIN snapshots prev ON prev.region = cur.region AND prev.category_id = cur.category_id
+                AND prev.taken_at < cur.taken_at
+            JOIN snapshot_videos sv ON sv.snapshot_id = prev.id AND sv.video_id = ?
+            WHERE cur.id = ?
+            ORDER BY prev.taken_at DESC LIMIT 1
+        """, (video_id, snapshot_id)).fetchone()
+        if row is None or row[0] <= row[1]:
+            return None
+        return (view_count - row[2]) / ((row[0] - row[1]) / 3600)
+
+
+class TrendingRefresher:
+    def __init__(self, index: TrendingIndex, regions: List[str] = TRENDING_REGIONS,
+                 categories: List[str] = TRENDING_CATEGORIES, interval: float = TRENDING_REFRESH_INTERVAL):
+        self.index = index
+        self.regions = regions
+        self.categories = categories
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Optional[float] = None
+        self.errors: Dict[str, str] = {}
+
+    def refresh(self):
+        for region in self.regions:
+            for category_id in self.categories:
+                # Another worker may have just taken this snapshot
+                last = self.index.last_taken_at(region, category_id)
+                if last and time.time() - last < self.interval * 0.9:
+                    continue
+                params = {"part": TRENDING_PARTS, "chart": "mostPopular", "regionCode": region, "maxResults": 50}
+                if category_id:
+                    params["videoCategoryId"] = category_id
+                try:
+                    data = youtube_get("videos", params, use_cache=False)
+                    if "error" in data:
+                        raise RuntimeError(data["error"].get("message", "trending fetch failed"))
+                    self.index.store(region, category_id, data.get("items", []))
+                    self.errors.pop(f"{region}:{category_id}", None)
+                except Exception as e:
+                    # Some categories have no chart in some regions
+                    self.errors[f"{region}:{category_id}"] = str(e)
+        self.index.purge()
+        self.last_run = time.time()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.errors["refresh"] = str(e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="trending-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "regions": self.regions,
+            "categories": self.categories,
+            "last_run": self.last_run,
+            "errors": dict(self.errors),
+        }
+
+
+_index = Singleton(TrendingIndex)
+_refresher = Singleton(lambda: TrendingRefresher(get_trending_index()))
+
+
+def get_trending_index() -> TrendingIndex:
+    return _index.get()
+
+
+def get_refresher() -> TrendingRefresher:
+    return _refresher.get()
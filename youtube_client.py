@@ -0,0 +1,455 @@
+import os
+import math
+import time
+import random
+import threading
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import get_cache
+from quota import get_scheduler, QuotaExceeded, endpoint_cost
+from keys import youtube_keys, NoKeyAvailable
+from storage import Singleton
+
+# Overridable so load tests can point at a local stub
+YOUTUBE_API_BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")
+
+# Connection pool and timeout settings (per worker process)
+POOL_SIZE = int(os.getenv("YOUTUBE_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("YOUTUBE_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("YOUTUBE_READ_TIMEOUT", "15"))
+MAX_RETRIES = int(os.getenv("YOUTUBE_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("YOUTUBE_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("YOUTUBE_BACKOFF_MAX", "8"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 403 reasons that mean the key itself is spent, so another key should be tried
+KEY_EXHAUSTED_REASONS = {"quotaExceeded", "dailyLimitExceeded", "rateLimitExceeded", "userRateLimitExceeded"}
+KEY_RATE_LIMIT_COOLDOWN = float(os.getenv("YOUTUBE_KEY_RATE_LIMIT_COOLDOWN", "60"))
+
+# channels.list and videos.list accept up to 50 IDs per call
+CHANNEL_BATCH_SIZE = 50
+VIDEO_BATCH_SIZE = 50
+
+# Bounds for paginated searches, per tool call
+SEARCH_PAGE_SIZE = int(os.getenv("YOUTUBE_SEARCH_PAGE_SIZE", "25"))
+SEARCH_MAX_PAGES = int(os.getenv("YOUTUBE_SEARCH_MAX_PAGES", "3"))
+# By default the budget covers every page plus its videos.list batches
+SEARCH_MAX_QUOTA = int(os.getenv("YOUTUBE_SEARCH_MAX_QUOTA") or SEARCH_MAX_PAGES * (
+    endpoint_cost("search") + math.ceil(SEARCH_PAGE_SIZE / VIDEO_BATCH_SIZE) * endpoint_cost("videos")
+))
+CHANNEL_PARTS = "snippet,statistics,brandingSettings"
+
+# Video parts that rarely change are cached per video for a week; statistics
+# are refreshed on their own with part=statistics
+STATIC_VIDEO_PARTS = ["snippet", "contentDetails", "topicDetails"]
+STATIC_VIDEO_TTL = float(os.getenv("YOUTUBE_CACHE_TTL_VIDEO_STATIC", "604800"))
+
+
+class LatencyStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, endpoint: str, elapsed: float, status: Optional[int], retries: int):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "calls": 0,
+                "errors": 0,
+                "retries": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            })
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            if status is None or status >= 400:
+                stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._endpoints.items():
+                entry = dict(stats)
+                entry["avg_seconds"] = stats["total_seconds"] / stats["calls"] if stats["calls"] else 0
+                result[endpoint] = entry
+            return result
+
+
+class YouTubeAPIError(Exception):
+    pass
+
+
+class YouTubeClient:
+    def __init__(self, pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, max_retries: int = MAX_RETRIES):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.stats = LatencyStats()
+
+        # Keep-alive session with a bounded pool; retries are handled below so
+        # that the backoff can be jittered and counted per endpoint
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter: sleep somewhere in [0, base * 2^attempt]
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def _request(self, endpoint: str, params: Dict[str, Any], etag: Optional[str] = None):
+        url = f"{YOUTUBE_API_BASE}/{endpoint}"
+        headers = {"If-None-Match": etag} if etag else None
+        start = time.perf_counter()
+        status = None
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                    status = response.status_code
+                    if status == 304:
+                        return None, status
+                    if status in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                        attempt += 1
+                        continue
+                    return response.json(), status
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.max_retries:
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+        finally:
+            self.stats.record(endpoint, time.perf_counter() - start, status, attempt)
+
+    def get(self, endpoint: str, params: Dict[str, Any], etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # With an etag, None means 304 Not Modified: the caller's copy is current
+        # An explicit key bypasses the pool
+        if params.get("key"):
+            charge_key(endpoint, params["key"])
+            return self._request(endpoint, params, etag)[0]
+
+        pool = youtube_keys()
+        rotation = KeyRotation(pool)
+        while True:
+            try:
+                with pool.acquire(exclude=rotation.tried) as api_key:
+                    if not rotation.charge(endpoint, api_key):
+                        continue
+                    data, status = self._request(endpoint, dict(params, key=api_key), etag)
+                    if rotation.accept(api_key, data, status):
+                        return data
+            except NoKeyAvailable as e:
+                return rotation.give_up(e)
+
+
+def charge_key(endpoint: str, api_key: str):
+    # Charge the call against this key's daily budget and rate limit first
+    get_scheduler().acquire(endpoint, api_key)
+
+
+class KeyRotation:
+    # One call's walk through the key pool, shared by the sync and async
+    # clients: keys over budget or reporting exhaustion are skipped in turn
+    def __init__(self, pool):
+        self.pool = pool
+        self.tried: List[str] = []
+        self.last_error: Optional[Exception] = None
+        self.last_data: Optional[Dict[str, Any]] = None
+
+    def charge(self, endpoint: str, api_key: str) -> bool:
+        try:
+            charge_key(endpoint, api_key)
+            return True
+        except QuotaExceeded as e:
+            self.tried.append(api_key)
+            self.last_error = e
+            return False
+
+    def accept(self, api_key: str, data: Dict[str, Any], status: Optional[int]) -> bool:
+        if not is_key_exhausted(data, status):
+            return True
+        # Park the key and move on to the next one
+        self.pool.cool_down(api_key, KEY_RATE_LIMIT_COOLDOWN if status == 429 else None)
+        self.tried.append(api_key)
+        self.last_data = data
+        return False
+
+    def give_up(self, error: NoKeyAvailable) -> Dict[str, Any]:
+        # The last key's error response beats a bare "no key available"
+        if self.last_data is not None:
+            return self.last_data
+        raise self.last_error or error
+
+
+def is_key_exhausted(data: Dict[str, Any], status: Optional[int]) -> bool:
+    if status == 429:
+        return True
+    if status != 403 or not isinstance(data, dict):
+        return False
+    errors = data.get("error", {}).get("errors", [])
+    return any(error.get("reason") in KEY_EXHAUSTED_REASONS for error in errors)
+
+
+_client = Singleton(YouTubeClient)
+
+
+def get_client() -> YouTubeClient:
+    return _client.get()
+
+
+def cached_response(endpoint: str, params: Dict[str, Any],
+                    use_cache: bool = True) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # (response to serve from the cache, expired copy to revalidate); both None on a miss
+    if not use_cache:
+        return None, None
+    cache = get_cache()
+    # Under quota pressure an expired cached response beats spending scarce units
+    cached = cache.get(endpoint, params, allow_stale=lambda: quota_pressure(endpoint))
+    if cached is not None:
+        return cached, None
+
+    # An expired copy with an ETag is revalidated instead of downloaded again
+    return None, cache.peek(endpoint, params)
+
+
+def store_response(endpoint: str, params: Dict[str, Any], data: Optional[Dict[str, Any]],
+                   stale: Optional[Dict[str, Any]], use_cache: bool = True) -> Dict[str, Any]:
+    # None from the client is a 304: the stale copy is current again
+    cache = get_cache()
+    if data is None:
+        cache.revalidated(endpoint, params, stale)
+        return stale
+    if use_cache:
+        cache.put(endpoint, params, data)
+    return data
+
+
+def youtube_get(endpoint: str, params: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+    cached, stale = cached_response(endpoint, params, use_cache)
+    if cached is not None:
+        return cached
+    data = get_client().get(endpoint, params, etag=stale.get("etag") if stale else None)
+    return store_response(endpoint, params, data, stale, use_cache)
+
+
+class SearchPages:
+    # Page and quota bookkeeping for a paginated search, shared by the sync and
+    # async clients: which search page to request next, and whether the budget
+    # still covers each videos.list batch
+    def __init__(self, search_params: Dict[str, Any], max_pages: int = SEARCH_MAX_PAGES,
+                 max_quota: int = SEARCH_MAX_QUOTA):
+        self.search_params = search_params
+        self.max_pages = max_pages
+        self.max_quota = max_quota
+        self.spent = 0
+        self.pages = 0
+        self.page_token: Optional[str] = None
+        self.exhausted = False
+
+    def next_search(self) -> Optional[Dict[str, Any]]:
+        # search.list params for the next page, or None when paging should stop
+        if self.exhausted or self.pages >= self.max_pages:
+            return None
+        if self.spent + endpoint_cost("search") > self.max_quota:
+            return None
+        params = dict(self.search_params, maxResults=SEARCH_PAGE_SIZE)
+        if self.page_token:
+            params["pageToken"] = self.page_token
+        return params
+
+    def video_batches(self, data: Dict[str, Any]) -> List[List[str]]:
+        # Books a search page's response; returns its video IDs in ranking order
+        self.pages += 1
+        self.spent += endpoint_cost("search")
+        check_error(data, "YouTube search failed")
+        self.page_token = data.get("nextPageToken")
+        self.exhausted = not self.page_token
+
+        video_ids = [item.get("id", {}).get("videoId") for item in data.get("items", [])]
+        video_ids = [video_id for video_id in video_ids if video_id]
+        return [video_ids[i:i + VIDEO_BATCH_SIZE] for i in range(0, len(video_ids), VIDEO_BATCH_SIZE)]
+
+    def charge_videos(self) -> bool:
+        # False once a videos.list batch would exceed the budget
+        if self.spent + endpoint_cost("videos") > self.max_quota:
+            return False
+        self.spent += endpoint_cost("videos")
+        return True
+
+
+def iter_video_pages(search_params: Dict[str, Any], parts: str, max_pages: int = SEARCH_MAX_PAGES,
+                     max_quota: int = SEARCH_MAX_QUOTA) -> Iterator[List[Dict[str, Any]]]:
+    # Lazily walks search.list pages and yields the matching videos.list items,
+    # one list per detail batch. The caller stops iterating once it has enough,
+    # so later pages are never requested.
+    pages = SearchPages(search_params, max_pages, max_quota)
+    while True:
+        params = pages.next_search()
+        if params is None:
+            return
+        for batch in pages.video_batches(youtube_get("search", params)):
+            if not pages.charge_videos():
+                return
+            # Keeps the search ranking order
+            yield fetch_videos(batch, parts)
+
+
+def quota_pressure(endpoint: str) -> bool:
+    scheduler = get_scheduler()
+    keys = youtube_keys().keys
+    return all(scheduler.under_pressure(endpoint, api_key) for api_key in keys) if keys else False
+
+
+def fetch_channels(channel_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    cache = get_cache()
+    channels: Dict[str, Dict[str, Any]] = {}
+    missing = []
+
+    # De-duplicate and serve whatever the shared cache already knows. Channels
+    # are cached one entry per ID so any later batch can reuse them.
+    for channel_id in dict.fromkeys(channel_ids):
+        if not channel_id:
+            continue
+        cached = cache.get("channels", {"part": CHANNEL_PARTS, "id": channel_id})
+        if cached is not None:
+            channels[channel_id] = cached["items"][0]
+        else:
+            missing.append(channel_id)
+
+    for i in range(0, len(missing), CHANNEL_BATCH_SIZE):
+        batch = missing[i:i + CHANNEL_BATCH_SIZE]
+        data = get_client().get("channels", {
+            "part": CHANNEL_PARTS,
+            "id": ",".join(batch),
+            "maxResults": CHANNEL_BATCH_SIZE
+        })
+        check_error(data, "YouTube channels lookup failed")
+        for item in data.get("items", []):
+            channels[item["id"]] = item
+            cache.put("channels", {"part": CHANNEL_PARTS, "id": item["id"]}, {"items": [item]})
+
+    return channels
+
+
+def _static_key(video_id: str) -> Dict[str, Any]:
+    return {"part": "static", "id": video_id}
+
+
+def plan_video_fetch(video_ids: List[str], parts: str):
+    # Splits a videos.list lookup into cached static items, the known IDs that
+    # only need statistics, and the unknown IDs that need a full fetch. Returns
+    # None when a requested part cannot be served from the static cache.
+    requested = [part.strip() for part in parts.split(",") if part.strip()]
+    if any(part not in STATIC_VIDEO_PARTS and part != "statistics" for part in requested):
+        return None
+    static_parts = [part for part in requested if part in STATIC_VIDEO_PARTS]
+
+    cache = get_cache()
+    items: Dict[str, Dict[str, Any]] = {}
+    known = []
+    missing = []
+    for video_id in dict.fromkeys(video_ids):
+        if not video_id:
+            continue
+        cached = cache.get("videos", _static_key(video_id))
+        # Checked against the parts that were requested, not the item's keys:
+        # YouTube omits topicDetails for videos without topics
+        if cached is not None and set(static_parts) <= set(cached.get("parts", [])):
+            items[video_id] = dict(cached["items"][0])
+            known.append(video_id)
+        else:
+            missing.append(video_id)
+    return items, (known if "statistics" in requested else []), missing
+
+
+def store_static_videos(items: Dict[str, Dict[str, Any]], data: Dict[str, Any], parts: str):
+    cache = get_cache()
+    requested = {part.strip() for part in parts.split(",") if part.strip() in STATIC_VIDEO_PARTS}
+    for item in data.get("items", []):
+        items[item["id"]] = item
+        # Merge with parts another caller already stored for this video
+        previous = cache.peek("videos", _static_key(item["id"]))
+        static = dict(previous["items"][0]) if previous else {}
+        static.update({name: value for name, value in item.items() if name != "statistics"})
+        stored = requested | set(previous.get("parts", [])) if previous else requested
+        cache.put("videos", _static_key(item["id"]), {"items": [static], "parts": sorted(stored)},
+                  ttl=STATIC_VIDEO_TTL)
+
+
+def merge_statistics(items: Dict[str, Dict[str, Any]], data: Dict[str, Any], batch: List[str]):
+    returned = set()
+    for item in data.get("items", []):
+        if item.get("id") in items:
+            items[item["id"]]["statistics"] = item.get("statistics", {})
+            returned.add(item["id"])
+
+    # A known video missing from the refresh was deleted or made private: drop
+    # it rather than serve the cached copy with no statistics
+    cache = get_cache()
+    for video_id in batch:
+        if video_id not in returned:
+            items.pop(video_id, None)
+            cache.delete("videos", _static_key(video_id))
+
+
+def ordered_items(video_ids: List[str], items: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [items[video_id] for video_id in dict.fromkeys(video_ids) if video_id in items]
+
+
+def check_error(data: Dict[str, Any], message: str):
+    if "error" in data:
+        raise YouTubeAPIError(data["error"].get("message", message))
+
+
+def fetch_videos(video_ids: List[str], parts: str) -> List[Dict[str, Any]]:
+    # videos.list items in input order. Static parts come from a long-lived
+    # per-video cache entry; only unknown videos are fetched in full and known
+    # ones get a part=statistics refresh, revalidated with its ETag
+    plan = plan_video_fetch(video_ids, parts)
+    if plan is None:
+        data = youtube_get("videos", {"part": parts, "id": ",".join(video_ids)})
+        check_error(data, "YouTube videos lookup failed")
+        return ordered_items(video_ids, {item.get("id"): item for item in data.get("items", [])})
+
+    items, known, missing = plan
+    for i in range(0, len(missing), VIDEO_BATCH_SIZE):
+        batch = missing[i:i + VIDEO_BATCH_SIZE]
+        data = youtube_get("videos", {"part": parts, "id": ",".join(batch)}, use_cache=False)
+        check_error(data, "YouTube videos lookup failed")
+        store_static_videos(items, data, parts)
+
+    for i in range(0, len(known), VIDEO_BATCH_SIZE):
+        batch = known[i:i + VIDEO_BATCH_SIZE]
+        data = youtube_get("videos", {"part": "statistics", "id": ",".join(batch)})
+        check_error(data, "YouTube statistics refresh failed")
+        merge_statistics(items, data, batch)
+
+    return ordered_items(video_ids, items)
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    return get_client().stats.snapshot()
+
+
+def cache_stats() -> Dict[str, Any]:
+    return get_cache().stats()
+
+
+def quota_status() -> Dict[str, Any]:
+    return get_scheduler().status()
+
+
+def key_stats() -> Dict[str, Any]:
+    return youtube_keys().stats()